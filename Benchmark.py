@@ -0,0 +1,154 @@
+'''
+Benchmark design generation outside Fusion 360.
+
+Runs the example scripts and synthetic arrays of transistors and resistors
+(placed one by one, and as a pattern with Circuit.array) against the recording fake of the Fusion API, and reports the Python time,
+the number of API calls, entities and features, and the peak memory of each.
+
+	python Benchmark.py --sizes 100 1000 10000 --json results.json
+	python Benchmark.py --baseline results.json
+
+With --baseline, the exit status is 1 if any case makes more API calls or
+features than the baseline, or is slower by more than the tolerance.
+'''
+
+import os
+import sys
+import gc
+import json
+import math
+import time
+import argparse
+import importlib
+import tracemalloc
+
+sys.path.insert(0,os.path.dirname(os.path.abspath(__file__)))
+
+import microfusion as mf
+from microfusion import fake_adsk
+
+def example(name):
+	'''Return a case running the main() of an example script.'''
+	def run(options):
+		importlib.import_module(name).main()
+	return run
+
+def array(kind,n,pitch,*args):
+	'''Return a case drawing n elements of a kind on a square grid.'''
+	def run(options):
+		design = mf.Design(**options)
+		cir = design.add_circuit()
+		add = getattr(cir,kind)
+		cols = math.ceil(math.sqrt(n))
+		for i in range(n):
+			add(mf.Pt(i%cols,i//cols)*pitch,*args)
+		design.build()
+	return run
+
+def pattern(kind,n,pitch,**kwargs):
+	'''Return a case adding the same square grid with Circuit.array().'''
+	def run(options):
+		design = mf.Design(**options)
+		cir = design.add_circuit()
+		cols = math.ceil(math.sqrt(n))
+		cir.array(kind,(0,0),cols,math.ceil(n/cols),pitch,**kwargs)
+		design.build()
+	return run
+
+def cases(sizes):
+	'''Return (name, case) of every benchmark.'''
+	out = [('Amp_Example',example('Amp_Example')),
+		('Resin_7_0',example('Resin_7_0'))]
+	for n in sizes:
+		out.append(('transistors-{}'.format(n),array('M',n,6000)))
+	for n in sizes:
+		out.append(('resistors-{}'.format(n),array('R',n,3000,50)))
+	for n in sizes:
+		out.append(('patterned-{}'.format(n),pattern('M',n,6000)))
+	return out
+
+def measure(case,options,memory=True):
+	'''Run a case and return its time, API counts and peak memory.'''
+	stats = fake_adsk.stats
+	fake_adsk.reset()
+	gc.collect()
+	start = time.perf_counter()
+	case(options)
+	result = {'seconds': time.perf_counter()-start}
+	result.update(stats.summary())
+	result['features_by_type'] = dict(stats.features)
+	if memory: # Measured in a second run, since tracing slows Python down
+		fake_adsk.reset()
+		gc.collect()
+		tracemalloc.start()
+		case(options)
+		result['peak_MB'] = tracemalloc.get_traced_memory()[1]/2**20
+		tracemalloc.stop()
+	return result
+
+def compare(results,baseline,tolerance):
+	'''Return a list of regressions against a baseline.'''
+	regressions = []
+	for name,result in results.items():
+		old = baseline.get(name)
+		if old is None:
+			continue
+		for key in ('calls','features'):
+			if result[key] > old[key]:
+				regressions.append('{}: {} {} > {}'.format(
+					name,key,result[key],old[key]))
+		if result['seconds'] > old['seconds']*(1+tolerance):
+			regressions.append('{}: {:.3f}s > {:.3f}s'.format(
+				name,result['seconds'],old['seconds']))
+	return regressions
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+	parser.add_argument('--sizes',type=int,nargs='*',default=[100,1000,10000],
+		help='Number of elements in the synthetic arrays')
+	parser.add_argument('--only',nargs='*',
+		help='Only run cases whose name starts with one of these')
+	parser.add_argument('--deferred',action='store_true',
+		help='Draw the synthetic arrays in deferred mode')
+	parser.add_argument('--instancing',action='store_true',
+		help='Draw the synthetic arrays with instancing')
+	parser.add_argument('--mode',default='full',
+		choices=['full','draft','preview'],
+		help='Level of detail of the synthetic arrays')
+	parser.add_argument('--no-memory',action='store_true',
+		help='Skip the second run measuring peak memory')
+	parser.add_argument('--json',help='Write the results to a JSON file')
+	parser.add_argument('--baseline',help='JSON results to compare against')
+	parser.add_argument('--tolerance',type=float,default=0.5,
+		help='Allowed fractional slowdown against the baseline')
+	args = parser.parse_args(argv)
+
+	fake_adsk.install()
+	options = {'deferred': args.deferred, 'instancing': args.instancing,
+		'mode': args.mode}
+	results = {}
+	print('{:<20}{:>10}{:>10}{:>10}{:>10}{:>10}'.format(
+		'case','seconds','calls','entities','features','peak MB'))
+	for name,case in cases(args.sizes):
+		if args.only and not any(name.startswith(o) for o in args.only):
+			continue
+		result = measure(case,options,not args.no_memory)
+		results[name] = result
+		print('{:<20}{:>10.3f}{:>10}{:>10}{:>10}{:>10}'.format(name,
+			result['seconds'],result['calls'],result['entities'],
+			result['features'],'{:.1f}'.format(result['peak_MB'])
+			if 'peak_MB' in result else '-'))
+
+	if args.json:
+		with open(args.json,'w') as f:
+			json.dump(results,f,indent=1)
+	if args.baseline:
+		with open(args.baseline) as f:
+			regressions = compare(results,json.load(f),args.tolerance)
+		for regression in regressions:
+			print('Regression in',regression)
+		return 1 if regressions else 0
+	return 0
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -1,4 +1,10 @@
-from .base import *
-from .elements import *
-from .point import *
-from .section import *
\ No newline at end of file
+from .base import *
+from .elements import *
+from .point import *
+from .section import *
+from .geometry import *
+from .backend import *
+from .fusion import *
+from .profiler import *
+from .validate import *
+from .pins import *
\ No newline at end of file
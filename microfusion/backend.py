@@ -0,0 +1,68 @@
+'''
+Drawing backends.
+
+A backend receives the primitives planned by each element and turns them into
+geometry. The Fusion backend draws them in Fusion 360, while the geometry
+backend only collects them so designs can be computed without Fusion.
+'''
+
+class Backend:
+	'''Base class for backends. Dispatches each primitive on its kind.'''
+	def add_circuit(self,circuit):
+		'''Prepare a new circuit for drawing.'''
+		pass
+
+	def flush(self,circuit):
+		'''Draw whatever is queued for a circuit. Called before clean().'''
+		pass
+
+	def clean(self,circuit):
+		'''Called after a batch of elements has been drawn in a circuit.'''
+		pass
+
+	def draw(self,circuit,element):
+		'''Draw an element and all of its parts in a circuit.'''
+		self.emit(circuit,element.plan())
+
+	def draw_array(self,circuit,array):
+		'''Draw an array of elements, one element at a time.'''
+		for element in array.elements:
+			self.draw(circuit,element)
+
+	def copy(self,source,circuit,transform):
+		'''Draw the Copy elements of a circuit, one element at a time.'''
+		for element in circuit.elements:
+			self.draw(circuit,element)
+
+	def emit(self,circuit,prims):
+		'''Draw a list of primitives in a circuit.'''
+		profiler = circuit.design.profiler
+		if profiler is None:
+			for prim in prims:
+				getattr(self,prim.kind)(circuit,prim)
+			return
+		for prim in prims:
+			with profiler.timer('api',prim.kind,circuit):
+				getattr(self,prim.kind)(circuit,prim)
+
+	def path(self,circuit,curves):
+		'''Draw connected curves in a circuit and return them as a path.'''
+		return curves
+
+	def cut(self,substrate,circuits,zspan,keep_tools=True):
+		'''Cut circuits overlapping zspan out of a substrate and return the timings.'''
+		return {'tools': 0}
+
+	def finish(self,design):
+		'''Called after all elements of a design have been drawn.'''
+		pass
+
+class GeometryBackend(Backend):
+	'''Headless backend which records the primitives of every circuit.'''
+	def __init__(self):
+		self.prims = [] # List of (circuit, primitive) in drawing order
+
+	def emit(self,circuit,prims):
+		'''Record a list of primitives in a circuit.'''
+		for prim in prims:
+			self.prims.append((circuit,prim))
@@ -1,149 +1,338 @@
-'''
-Base Design and Circuit classes.
-'''
-
-import adsk.core, adsk.fusion, traceback
-
-from .point import *
-from .section import *
-from .elements import *
-
-def printm(message):
-	app = adsk.core.Application.get()
-	ui  = app.userInterface
-	ui.messageBox(message)
-
-class Design:
-	def __init__(self,origin=Pt(0,0,0),params=dict()):
-		'''Construct the Design object.'''
-		
-		self.origin = origin # Origin wrt Fusion origin
-		
-		# Make the params default dictionary
-		self.params = { # Default values
-			# Constants
-			'fluid_Mu':1.01e-3, # Fluid dynamic viscosity in Pa*s
-			# Fab parameters
-			'slop': 250, # Slop in alignment to space elements in UM
-			'sub_H': 4000, # Substrate thickness in UM
-			# Element parameters
-			'trace_sec': RecSec(W=250, H=50), # Default section
-			'trace_R': 250, # Trace radius of curvature in UM
-			'trace_cap': 'none', # Trace endcap ('none','round','square')
-			'chan_sec': RecSec(W=250, H=50), # Transistor flow channel section
-			'gate_sec': RecSec(W=250, H=-50), # Transistor gate section
-			'res_sec': RecSec(W=50, H=50), # Resistor section
-			'res_L': 1000, # Resistor bounding box length in UM
-			'res_cap': 'none', # Resistor endcap ('none','round','square')
-			'via_R': 350, # Via radius in UM
-			}
-		for key in params: # Overwrite the defaults
-			self.params[key] = params[key]
-
-		self.units = Pt().units # Get units from Point class
-
-		self.circuits = [] # List of all circuits
-
-		# TBD: Clear all elements on every rerun
-
-		# Set up the app
-		self._app = adsk.core.Application.get()
-		self._ui = self._app.userInterface
-		self._product = self._app.activeProduct
-		self._design = adsk.fusion.Design.cast(self._product)
-		# Do not capture design history for speed
-		self._design.designType = adsk.fusion.DesignTypes.DirectDesignType
-		self._root_comp = self._design.rootComponent
-
-	def add_circuit(self,*args,**kwargs):
-		'''Add a circuit to the design.'''
-		cir = Circuit(self,*args,**kwargs)
-		self.circuits.append(cir)
-		return cir
-
-	def draw_substrate(self,xlen,ylen,zspan,origin=None):
-		'''Draw a cuboid centered at 0,0 from z[0] to z[1].'''
-		origin = self.origin if origin is None else origin
-		circuit = self.add_circuit()
-		left = origin + Pt(-xlen/2,0,zspan[0])
-		right = origin + Pt(xlen/2,0,zspan[0])
-		substrate = circuit.T([left,right],
-			secs=RecSec(W=ylen,H=zspan[1]-zspan[0]))
-		# Perform intersection with 
-
-class Circuit:
-	def __init__(self,design,origin=Pt(0,0,0),**kwargs):
-		'''Construct the Circuit'''
-		self.design = design
-		self.origin = origin
-
-		self.params = self.design.params.copy()
-		for key in kwargs: # Overwrite params with kw params
-			if key in self.params.keys():
-				self.params[key] = kwargs[key]
-
-		self.elements = [] # List of all elements
-
-		# Create the circuit component and sketchplane
-		self._occ = self.design._root_comp.occurrences.addNewComponent(
-			adsk.core.Matrix3D.create())
-		self._comp = self._occ.component
-		self._sketch = self._comp.sketches.add(
-			self._comp.xYConstructionPlane)
-		self._sketch.isComputeDeferred = True # Saves time evaluating
-		self._sketch.areProfilesShown = False # Saves time drawing
-		self._sketch.isLightBulbOn = False # Reduce visual clutter
-
-	def clean_sketch(self):
-		'''Deletes the existing sketch and creates a fresh sketch for performance improvements.'''
-		# Fusion becomes much slower the more objects you add to a sketch
-		# Run each time after finished drawing a new element
-		self._sketch.deleteMe()
-		self._sketch = self._comp.sketches.add(
-			self._comp.xYConstructionPlane)
-		self._sketch.isComputeDeferred = True # Saves time evaluating
-		self._sketch.areProfilesShown = False # Saves time drawing
-		self._sketch.isLightBulbOn = False # Reduce visual clutter
-
-	## Elements
-	def T(self,*args,**kwargs):
-		'''Add a Trace to the circuit.'''
-		trace = Trace(self,*args,**kwargs)
-		self.elements.append(trace)
-		self.clean_sketch()
-		return trace
-
-	def V(self,*args,**kwargs):
-		'''Add a Via to the circuit.'''
-		via = Via(self,*args,**kwargs)
-		self.elements.append(via)
-		self.clean_sketch()
-		return via
-
-	def M(self,*args,**kwargs):
-		'''Add a Transistor to the circuit.'''
-		trans = Transistor(self,*args,**kwargs)
-		self.elements.append(trans)
-		self.clean_sketch()
-		return trans
-
-	def R(self,*args,**kwargs):
-		'''Add a Resistor to the circuit.'''
-		res = Resistor(self,*args,**kwargs)
-		self.elements.append(res)
-		self.clean_sketch()
-		return res
-
-	def P(self,*args,**kwargs):
-		'''Add a Port to the circuit.'''
-		port = Port(self,*args,**kwargs)
-		self.elements.append(port)
-		self.clean_sketch()
-		return port
-
-	def text(self,*args,**kwargs):
-		'''Add text to the circuit.'''
-		txt = Text(self,*args,**kwargs)
-		self.elements.append(txt)
-		self.clean_sketch()
-		return txt
\ No newline at end of file
+'''
+Base Design and Circuit classes.
+'''
+
+try:
+	import adsk.core, adsk.fusion
+except ImportError: # Running headless outside of Fusion
+	adsk = None
+
+import os
+import gc
+import sys
+import math
+import time
+import inspect
+import itertools
+import concurrent.futures
+
+from .point import *
+from .section import *
+from .elements import *
+from .backend import *
+from .fusion import *
+from .validate import *
+from .pins import *
+from .profiler import *
+
+def printm(message):
+	app = adsk.core.Application.get()
+	ui  = app.userInterface
+	ui.messageBox(message)
+
+class Design:
+	profiler = None # Profiler of designs created without one
+	overrides = {} # Backend and params replacing those of every new design
+
+	def __init__(self,origin=Pt(0,0,0),params=dict(),deferred=False,
+		backend='fusion',instancing=False,incremental=False,batching=True,
+		profiler=None,mode='full',preflight=True):
+		'''Construct the Design object.'''
+		
+		self.origin = origin # Origin wrt Fusion origin
+		self.deferred = deferred # Record elements and draw them in build()
+		self.instancing = instancing # Share components between equal elements
+		self.incremental = incremental # Only redraw changed elements on rerun
+		self.batching = batching # Extrude equal extents together
+		if mode not in ('full','draft','preview'):
+			raise ValueError('Unknown mode {!r}'.format(mode))
+		self.mode = mode # Level of detail of the drawing
+		self.preflight = preflight # Validate elements before drawing them
+		if mode == 'preview': # Sketches only, nothing to share or keep
+			self.instancing = self.incremental = False
+		if profiler is not None:
+			self.profiler = profiler # Times the build (None to disable)
+		
+		# Make the params default dictionary
+		self.params = { # Default values
+			# Constants
+			'fluid_Mu':1.01e-3, # Fluid dynamic viscosity in Pa*s
+			# Fab parameters
+			'slop': 250, # Slop in alignment to space elements in UM
+			'sub_H': 4000, # Substrate thickness in UM
+			'fab_res': None, # Printer resolution (pixel pitch) in UM
+			# Element parameters
+			'trace_sec': RecSec(W=250, H=50), # Default section
+			'trace_R': 250, # Trace radius of curvature in UM
+			'trace_cap': 'none', # Trace endcap ('none','round','square')
+			'trace_join': False, # Draw each trace as one sweep or loft body
+			'chan_sec': RecSec(W=250, H=50), # Transistor flow channel section
+			'gate_sec': RecSec(W=250, H=-50), # Transistor gate section
+			'res_sec': RecSec(W=50, H=50), # Resistor section
+			'res_L': 1000, # Resistor bounding box length in UM
+			'res_cap': 'none', # Resistor endcap ('none','round','square')
+			'via_R': 350, # Via radius in UM
+			}
+		params = dict(params,**self.overrides.get('params',{}))
+		for key in params: # Overwrite the defaults
+			self.params[key] = params[key]
+
+		self.units = Pt().units # Get units from Point class
+
+		self.circuits = [] # List of all circuits
+		self.substrates = [] # List of (circuit, zspan) of substrate layers
+
+		# TBD: Clear all elements on every rerun (unless incremental)
+
+		# Set up the backend
+		backend = self.overrides.get('backend',backend)
+		if backend == 'fusion':
+			backend = FusionBackend()
+		elif backend == 'geometry':
+			backend = GeometryBackend()
+		self.backend = backend
+
+	def add_circuit(self,*args,**kwargs):
+		'''Add a circuit to the design.'''
+		cir = Circuit(self,*args,**kwargs)
+		self.circuits.append(cir)
+		return cir
+
+	def draw_substrate(self,xlen,ylen,zspan,origin=None):
+		'''Draw a cuboid centered at 0,0 from z[0] to z[1].'''
+		origin = self.origin if origin is None else origin
+		circuit = self.add_circuit()
+		left = origin + Pt(-xlen/2,0,zspan[0])
+		right = origin + Pt(xlen/2,0,zspan[0])
+		substrate = circuit.T([left,right],
+			secs=RecSec(W=ylen,H=zspan[1]-zspan[0]))
+		self.substrates.append((circuit,zspan))
+		return substrate
+
+	def cut_substrates(self,keep_tools=True):
+		'''Build, then cut the other circuits out of each substrate layer.'''
+		if self.incremental and not keep_tools:
+			raise ValueError('keep_tools=False would consume the tool bodies '
+				'which incremental designs keep for the next run')
+		start = time.perf_counter()
+		self.build()
+		timings = {'build': time.perf_counter()-start, 'layers': []}
+		subs = [cir for cir,zspan in self.substrates]
+		tools = [cir for cir in self.circuits if cir not in subs]
+		for cir,zspan in self.substrates:
+			if self.profiler is None:
+				timing = self.backend.cut(cir,tools,zspan,keep_tools)
+			else:
+				with self.profiler.timer('api','cut',cir):
+					timing = self.backend.cut(cir,tools,zspan,keep_tools)
+			timing['zspan'] = tuple(zspan)
+			timings['layers'].append(timing)
+		return timings
+
+	def validate(self):
+		'''Return the Issues of every element of the design, drawn or not.'''
+		return [issue for cir in self.circuits for issue in validate(cir)]
+
+	def pins(self,tol=None):
+		'''Return a PinRegistry of the pins and nets of every element so far.'''
+		return PinRegistry(self,tol)
+
+	def check(self,pending):
+		'''Raise a ValidationError for errors of (circuit, elements[, first]).'''
+		issues = errors([issue for cir,elements,*first in pending
+			for issue in validate(cir,elements,*first)])
+		if issues:
+			raise ValidationError(issues)
+
+	def plan(self,parallel=None,chunksize=64):
+		'''Plan the pending elements, in a pool of parallel processes if given.'''
+		pending = [element for cir in self.circuits
+			for element in _flatten(cir._pending)]
+		todo = [element for element in pending if element._prims is None]
+		if parallel and len(todo) > 1:
+			# Unpickling the plans creates many small objects, which would
+			# trigger a garbage collection pass every few hundred primitives
+			enabled = gc.isenabled()
+			gc.disable()
+			try:
+				with concurrent.futures.ProcessPoolExecutor(parallel,
+					initializer=gc.disable) as pool:
+					for element,(prims,issues) in zip(todo,pool.map(_plan,
+						todo,itertools.repeat(self.preflight),
+						chunksize=chunksize)):
+						element._prims = prims
+						if issues is not None:
+							element._issues = issues
+			finally:
+				if enabled:
+					gc.enable()
+		return [element.plan() for element in pending]
+
+	def build(self,batch=None):
+		'''Draw all recorded elements, cleaning the sketch every batch if given.'''
+		if self.preflight: # Report all errors before drawing anything
+			self.check([(cir,_flatten(cir._pending)) for cir in self.circuits])
+		for cir in self.circuits:
+			cir.build(batch)
+		self.backend.finish(self)
+
+def _plan(element,check=False):
+	'''Plan an element in a worker process, and check it if asked.'''
+	return element.plan(), element.check() if check else None
+
+def _flatten(items):
+	'''Return the elements of a list of elements and ElementArrays.'''
+	return [element for item in items for element in (item.elements
+		if isinstance(item,ElementArray) else [item])]
+
+_package = os.path.dirname(os.path.abspath(__file__))
+_inside = {} # Whether each code file is part of this package
+
+def _caller():
+	'''Return (file, line) of the first caller outside of this package.'''
+	frame = sys._getframe(2)
+	while frame is not None:
+		name = frame.f_code.co_filename
+		if name not in _inside:
+			_inside[name] = os.path.dirname(os.path.abspath(name)) == _package
+		if not _inside[name]:
+			return os.path.basename(name), frame.f_lineno
+		frame = frame.f_back
+	return None
+
+class Circuit:
+	def __init__(self,design,origin=Pt(0,0,0),**kwargs):
+		'''Construct the Circuit'''
+		self.design = design
+		self.origin = origin
+		self.name = 'Circuit {}'.format(len(design.circuits))
+
+		self.params = self.design.params.copy()
+		for key in kwargs: # Overwrite params with kw params
+			if key in self.params.keys():
+				self.params[key] = kwargs[key]
+
+		self.elements = [] # List of all elements
+		self._pending = [] # Elements recorded but not drawn (deferred mode)
+
+		# Create the circuit component and sketchplane
+		self.design.backend.add_circuit(self)
+
+	def clean_sketch(self):
+		'''Deletes the existing sketch and creates a fresh sketch for performance improvements.'''
+		# Run each time after finished drawing a new element
+		profiler = self.design.profiler
+		if profiler is None:
+			self.design.backend.clean(self)
+		else: # Queued features apart, so clean_sketch is only the clean up
+			with profiler.timer('api','flush',self):
+				self.design.backend.flush(self)
+			with profiler.timer('api','clean_sketch',self):
+				self.design.backend.clean(self)
+
+	def add(self,element):
+		'''Add an element, drawing it now unless the design is deferred.'''
+		elements = _flatten([element])
+		source = _caller()
+		for e in elements:
+			e.source = source
+		if self.design.preflight and not self.design.deferred:
+			self.design.check([(self,elements,len(self.elements))])
+		self.elements += elements # Only once they passed the checks
+		if self.design.deferred:
+			self._pending.append(element)
+		else:
+			self.draw(element)
+			self.clean_sketch()
+		return element
+
+	def build(self,batch=None):
+		'''Draw all pending elements, cleaning the sketch once at the end.'''
+		pending, self._pending = self._pending, []
+		for i,element in enumerate(pending):
+			self.draw(element)
+			if batch and (i+1) % batch == 0:
+				self.clean_sketch()
+		if pending:
+			self.clean_sketch()
+
+	def draw(self,element):
+		'''Draw an element, timing it if the design has a profiler.'''
+		profiler = self.design.profiler
+		if profiler is None:
+			element.draw()
+			return
+		with profiler.timer('circuit',self.name,self):
+			with profiler.timer('element',type(element).__name__,element):
+				element.draw()
+
+	## Elements
+	def T(self,*args,**kwargs):
+		'''Add a Trace to the circuit.'''
+		return self.add(Trace(self,*args,**kwargs))
+
+	def V(self,*args,**kwargs):
+		'''Add a Via to the circuit.'''
+		return self.add(Via(self,*args,**kwargs))
+
+	def M(self,*args,**kwargs):
+		'''Add a Transistor to the circuit.'''
+		return self.add(Transistor(self,*args,**kwargs))
+
+	def R(self,*args,**kwargs):
+		'''Add a Resistor to the circuit.'''
+		return self.add(Resistor(self,*args,**kwargs))
+
+	def P(self,*args,**kwargs):
+		'''Add a Port to the circuit.'''
+		return self.add(Port(self,*args,**kwargs))
+
+	_kinds = {'M': Transistor, 'R': Resistor, 'V': Via, 'P': Port}
+
+	def array(self,kind,origin,nx,ny,pitch,**kwargs):
+		'''Add an nx by ny grid of equal elements and return the ElementArray.'''
+		cls = self._kinds.get(kind,kind)
+		px, py = pitch if isinstance(pitch,(tuple,list)) else (pitch,pitch)
+		origin = Pt(*origin) if isinstance(origin,tuple) else origin
+		elements = [cls(self,origin+(i*px,j*py),**kwargs)
+			for i in range(nx) for j in range(ny)]
+		return self.add(ElementArray(self,elements,(nx,ny),
+			('rectangular',px,py)))
+
+	def polar(self,kind,center,radius,n,angle=360,**kwargs):
+		'''Add n equal elements on a circle around center, facing it.'''
+		cls = self._kinds.get(kind,kind)
+		center = Pt(*center) if isinstance(center,tuple) else center
+		step = angle/n if angle == 360 else angle/max(n-1,1)
+		rotation = kwargs.pop('rotation',0)
+		turns = 'rotation' in inspect.signature(cls).parameters
+		elements = []
+		for k in range(n):
+			a = math.radians(k*step)
+			if turns:
+				kwargs['rotation'] = rotation+k*step
+			elements.append(cls(self,
+				center+(radius*math.cos(a),radius*math.sin(a)),**kwargs))
+		return self.add(ElementArray(self,elements,(n,),
+			('circular',center,angle)))
+
+	def text(self,*args,**kwargs):
+		'''Add text to the circuit.'''
+		return self.add(Text(self,*args,**kwargs))
+
+	## Copies
+	def copy(self,transform,**kwargs):
+		'''Add a copy of the circuit moved by a Transform as a new circuit.'''
+		if self.design.preflight:
+			self.design.check([(self,_flatten(self._pending))])
+		self.build() # Bodies must exist before they are copied
+		circuit = self.design.add_circuit(transform.point(self.origin),**kwargs)
+		circuit.elements = [Copy(circuit,element,transform)
+			for element in self.elements]
+		self.design.backend.copy(self,circuit,transform)
+		circuit.clean_sketch()
+		return circuit
+
+	def mirror(self,plane='yz',distance=0,**kwargs):
+		'''Add the mirror image of the circuit across a plane as a new circuit.'''
+		return self.copy(Transform(mirror=(plane,distance)),**kwargs)
\ No newline at end of file
@@ -0,0 +1,268 @@
+'''
+Design rule checking.
+
+Checks that elements outside the substrates keep a minimum clearance from each
+other, and only touch where they are on one net.
+'''
+
+import math
+
+from .geometry import *
+from .pins import *
+
+class Violation:
+	def __init__(self,kind,a,b,gap,pt,zspan):
+		'''Elements a and b, as (circuit, element), which are too close.'''
+		self.kind = kind # 'spacing', or 'short' if they overlap unconnected
+		self.a = a
+		self.b = b
+		self.gap = gap
+		self.pt = pt
+		self.zspan = zspan
+
+	def __str__(self):
+		def name(item):
+			circuit, element = item
+			source = getattr(element,'source',None)
+			return '{} element {} ({}{})'.format(circuit.name,
+				circuit.elements.index(element),type(element).__name__,
+				'' if source is None else ', {}:{}'.format(*source))
+		return '{} at ({:.6g}, {:.6g}) z {:.6g} to {:.6g}: {} and {} {}'.format(
+			self.kind,self.pt[0],self.pt[1],self.zspan[0],self.zspan[1],
+			name(self.a),name(self.b),'overlap' if self.kind == 'short'
+			else 'are {:.6g} apart'.format(self.gap))
+
+
+## Footprints
+# A capsule is (x1, y1, x2, y2, r, z0, z1): all points within r of a segment
+_heights = {} # Z extent of each section profile, by id, with the section
+
+def _height(sec):
+	'''Return the lowest and highest z of a section around its centerline.'''
+	# Keyed by id, as hashing sections is slow, keeping the section alive
+	entry = _heights.get(id(sec))
+	if entry is None or entry[0] is not sec:
+		pts, template = sec.local()
+		entry = _heights[id(sec)] = (sec,min(pts.z),max(pts.z))
+	return entry[1], entry[2]
+
+def _sweep(curve,s1,s2):
+	'''Return the capsules of sections swept along a line or arc.'''
+	r = max(s1.span,s2.span)/2
+	lo, hi = _height(s1)
+	if s2 is not s1:
+		h = _height(s2)
+		lo, hi = min(lo,h[0]), max(hi,h[1])
+	p1, p2 = curve.p1, curve.p2
+	z0 = min(p1.z,p2.z)+lo
+	z1 = max(p1.z,p2.z)+hi
+	if isinstance(curve,Arc): # Two chords, widened by their sagitta to cover the arc
+		pm, R = curve.pm, curve.R
+		c2 = ((p1.x-pm.x)**2+(p1.y-pm.y)**2+(p1.z-pm.z)**2)/4
+		r += R-math.sqrt(max(0,R*R-c2))
+		return [(p1.x,p1.y,pm.x,pm.y,r,z0,z1),(pm.x,pm.y,p2.x,p2.y,r,z0,z1)]
+	return [(p1.x,p1.y,p2.x,p2.y,r,z0,z1)]
+
+def capsules(prim):
+	'''Return the capsules covering a primitive.'''
+	kind = prim.kind
+	if kind in ('loft','sweep'):
+		return _sweep(prim.curve,prim.s1,prim.s2)
+	if kind == 'trace':
+		return [c for loft in prim.lofts for c in _sweep(loft.curve,loft.s1,loft.s2)]
+	if kind == 'cylinder':
+		p = prim.pt
+		return [(p.x,p.y,p.x,p.y,prim.R,min(prim.zspan),max(prim.zspan))]
+	if kind == 'revolve':
+		c = prim.axis.p1
+		R = max(math.hypot(pt.x-c.x,pt.y-c.y) for pt in prim.pts)
+		zs = [pt.z for pt in prim.pts]
+		return [(c.x,c.y,c.x,c.y,R,min(zs),max(zs))]
+	if kind == 'text': # Lines of text follow v from pt, about .6 of size per letter
+		p, u, v, h = prim.pt, prim.u, prim.v, prim.size/2
+		w = max(len(line) for line in prim.text.split('\n'))*prim.size*.6
+		n = prim.text.count('\n')+1
+		a = max(w-h,h) # Along u, from h to a
+		return [(p.x+u.x*h+v.x*b,p.y+u.y*h+v.y*b,p.x+u.x*a+v.x*b,p.y+u.y*a+v.y*b,
+			h,min(prim.zspan),max(prim.zspan))
+			for b in [h+2*h*i for i in range(n)]]
+	return [] # Preview outlines have no width
+
+def footprint(element):
+	'''Return the capsules of an element and all of its parts.'''
+	return [c for prim in element.plan() for c in capsules(prim)]
+
+
+## Distances
+def _segments(a,b):
+	'''Return the distance between two segments and a point between them.'''
+	ax, ay, bx, by = a[0], a[1], a[2], a[3]
+	cx, cy, dx, dy = b[0], b[1], b[2], b[3]
+	best = None
+	for px,py,qx,qy,rx,ry in ((ax,ay,cx,cy,dx,dy),(bx,by,cx,cy,dx,dy),
+		(cx,cy,ax,ay,bx,by),(dx,dy,ax,ay,bx,by)):
+		# Distance from an end point p to the other segment qr
+		ux, uy = rx-qx, ry-qy
+		l = ux*ux+uy*uy
+		t = 0 if l == 0 else max(0,min(1,((px-qx)*ux+(py-qy)*uy)/l))
+		sx, sy = qx+t*ux, qy+t*uy
+		d = math.hypot(px-sx,py-sy)
+		if best is None or d < best[0]:
+			best = (d,((px+sx)/2,(py+sy)/2))
+	# Crossing segments are 0 apart, which no end point distance shows
+	d1 = (bx-ax)*(cy-ay)-(by-ay)*(cx-ax)
+	d2 = (bx-ax)*(dy-ay)-(by-ay)*(dx-ax)
+	d3 = (dx-cx)*(ay-cy)-(dy-cy)*(ax-cx)
+	d4 = (dx-cx)*(by-cy)-(dy-cy)*(bx-cx)
+	if d1*d2 < 0 and d3*d4 < 0:
+		t = d3/(d3-d4)
+		return 0, (ax+t*(bx-ax),ay+t*(by-ay))
+	return best
+
+def _inside(pt,caps,eps=1e-6):
+	'''Whether a pin lies within any of the capsules.'''
+	for c in caps:
+		if c[5]-eps <= pt.z <= c[6]+eps:
+			if _segments((pt.x,pt.y,pt.x,pt.y),c)[0] <= c[4]+eps:
+				return True
+	return False
+
+
+## Checking
+def _cap_box(c):
+	'''Return the XY bounding box of a capsule.'''
+	x0, x1 = (c[0],c[2]) if c[0] <= c[2] else (c[2],c[0])
+	y0, y1 = (c[1],c[3]) if c[1] <= c[3] else (c[3],c[1])
+	r = c[4]
+	return (x0-r,y0-r,x1+r,y1+r)
+
+def _box(boxes):
+	'''Return the XY bounding box of the boxes of capsules.'''
+	if len(boxes) == 1:
+		return boxes[0]
+	x0s, y0s, x1s, y1s = zip(*boxes)
+	return (min(x0s),min(y0s),max(x1s),max(y1s))
+
+def _closest(caps1,caps2,clearance,boxes1,boxes2):
+	'''Return (gap, pt, zspan) of the closest capsules sharing a z range.'''
+	best = None
+	for c1,b1 in zip(caps1,boxes1):
+		for c2,b2 in zip(caps2,boxes2):
+			if (c1[5] >= c2[6] or c2[5] >= c1[6]
+				or b1[0] > b2[2]+clearance or b2[0] > b1[2]+clearance
+				or b1[1] > b2[3]+clearance or b2[1] > b1[3]+clearance):
+				continue
+			d, pt = _segments(c1,c2)
+			gap = d-c1[4]-c2[4]
+			if best is None or gap < best[0]:
+				best = (gap,pt,(float(max(c1[5],c2[5])),float(min(c1[6],c2[6]))))
+	return best
+
+def _contacts(caps1,caps2,eps=1e-6):
+	'''Return (pt, zspan) of every pair of capsules which touch.'''
+	out = []
+	for c1 in caps1:
+		for c2 in caps2:
+			if c1[5] < c2[6] and c2[5] < c1[6]:
+				d, pt = _segments(c1,c2)
+				if d <= c1[4]+c2[4]+eps:
+					out.append((pt,(float(max(c1[5],c2[5])),
+						float(min(c1[6],c2[6])))))
+	return out
+
+def check(design,clearance=None,cell=None):
+	'''Return the Violations of all elements outside the substrates.'''
+	clearance = design.params['slop'] if clearance is None else clearance
+	subs = [cir for cir,zspan in design.substrates]
+	owners = [] # (circuit, element) of each element
+	caps = [] # Capsules of each element
+	for cir in design.circuits:
+		if cir not in subs:
+			for element in cir.elements:
+				cs = footprint(element)
+				if cs:
+					owners.append((cir,element))
+					caps.append(cs)
+	if not caps:
+		return []
+	cap_boxes = [[_cap_box(c) for c in cs] for cs in caps]
+	boxes = [_box(bs) for bs in cap_boxes]
+	if cell is None:
+		sizes = sorted(max(b[2]-b[0],b[3]-b[1]) for b in boxes)
+		cell = max(4*clearance,sizes[len(sizes)//2],1e-6)
+	# Bin each element, grown by the clearance, into every cell it touches
+	grid = {}
+	for k,b in enumerate(boxes):
+		for i in range(math.floor(b[0]/cell),math.floor((b[2]+clearance)/cell)+1):
+			for j in range(math.floor(b[1]/cell),
+				math.floor((b[3]+clearance)/cell)+1):
+				grid.setdefault((i,j),[]).append(k)
+	# Closest approach of every pair of elements sharing a cell
+	closest = {}
+	for (i,j),ks in grid.items():
+		for m,k1 in enumerate(ks):
+			b1 = boxes[k1]
+			for k2 in ks[m+1:]:
+				b2 = boxes[k2]
+				if (b1[0] > b2[2]+clearance or b2[0] > b1[2]+clearance
+					or b1[1] > b2[3]+clearance or b2[1] > b1[3]+clearance):
+					continue
+				# Only compare each pair in the cell of the corner of the
+				# overlap of their boxes, so pairs sharing many cells count once
+				if (math.floor(max(b1[0],b2[0])/cell) != i
+					or math.floor(max(b1[1],b2[1])/cell) != j):
+					continue
+				near = _closest(caps[k1],caps[k2],clearance,cap_boxes[k1],
+					cap_boxes[k2])
+				if near is not None and near[0] < clearance:
+					closest[(k1,k2)] = near
+	# Touching elements are connected where the parts of them which meet are
+	# on one net: all of a trace or via, or the closest pin of other elements
+	pins = None # Registered pins of each element, once a contact needs them
+	def net(k,pt):
+		nonlocal pins
+		if pins is None:
+			pins = {}
+			for pin in PinRegistry(design).pins:
+				pins.setdefault(id(pin.element),[]).append(pin)
+		element = owners[k][1]
+		near = pins.get(id(element))
+		if not near:
+			return None
+		if element.wires(): # Its pins are all on one net
+			return near[0].net
+		return min(near,key=lambda pin: math.hypot(pin.pt.x-pt[0],
+			pin.pt.y-pt[1])).net
+	def short(k1,k2):
+		'''Return (pt, zspan) of the first contact between two nets, if any.'''
+		for pt,zspan in _contacts(caps[k1],caps[k2]):
+			n1 = net(k1,pt)
+			if n1 is None or n1 != net(k2,pt):
+				return pt, zspan
+		return None
+	violations = []
+	for (k1,k2),(gap,pt,zspan) in sorted(closest.items()):
+		if gap <= 1e-6:
+			contact = short(k1,k2)
+			if contact is not None:
+				violations.append(Violation('short',owners[k1],owners[k2],gap,
+					*contact))
+		else:
+			violations.append(Violation('spacing',owners[k1],owners[k2],gap,pt,
+				zspan))
+	return violations
+
+def layers(violations,design=None):
+	'''Return the violations grouped by substrate layer, or else by z range.'''
+	spans = [] if design is None else [tuple(zspan)
+		for cir,zspan in design.substrates]
+	out = {}
+	for v in violations:
+		found = False
+		for zspan in spans:
+			if v.zspan[0] < max(zspan) and v.zspan[1] > min(zspan):
+				out.setdefault(zspan,[]).append(v)
+				found = True
+		if not found:
+			out.setdefault(v.zspan,[]).append(v)
+	return out
@@ -1,363 +1,457 @@
-'''
-Elements classes.
-'''
-import adsk.core, adsk.fusion, traceback
-
-import math
-import copy
-
-from .base import *
-from .point import *
-from .section import *
-
-class Trace:
-	def __init__(self,circuit,pts,secs=None,**kwargs):
-		'''Constructor for a trace.'''
-		self.circuit = circuit
-		self.pts = [Pt(*pt) if isinstance(pt,tuple) else pt for pt in pts]
-		pts = self.pts
-		if secs is None: # Use default if no sections are passed
-			secs = circuit.params['trace_sec']
-		if isinstance(secs,Section): # Expand sections to fill list
-			secs = [secs for i in range(len(pts))]
-		self.secs = secs
-		self.params = circuit.params.copy()
-		for key in kwargs: # Overwrite params with kw params
-			if key in self.params.keys():
-				self.params[key] = kwargs[key]
-
-		# Drawing parameters
-		eps = 1e-3
-		Rs = self.params['trace_R']
-		if not isinstance(Rs,list):
-			Rs = [Rs for i in range(len(pts))]
-		# Avoid self-intersections by ensuring R>sec.span/2
-		Rs = [max(Rs[i],secs[i].span/2+eps) for i in range(len(pts))]
-
-		# Helper function to draw a loft
-		def makeLoft(curve,s1,s2,n1,n2):
-			# Make object collection
-			skel = adsk.core.ObjectCollection.create()
-			if not curve.isValid:
-				return
-			skel.add(curve)
-			skel_path = circuit._comp.features.createPath(skel)
-			# Prepare Loft
-			loft_inp = circuit._comp.features.loftFeatures.createInput(
-			adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
-			# Draw the sections
-			p1 = Pt(curve.startSketchPoint.geometry)
-			p2 = Pt(curve.endSketchPoint.geometry)
-			if n1.x*n2.y - n2.x*n1.y < 0:
-				n1,n2 = n2,n1
-				asec1 = s1.draw(circuit,p1,n1)
-				asec2 = s2.draw(circuit,p2,n2)
-				if asec2.isValid:
-					loft_inp.loftSections.add(asec2)
-				if asec1.isValid:
-					loft_inp.loftSections.add(asec1)
-			else:
-				asec1 = s1.draw(circuit,p1,n1)
-				asec2 = s2.draw(circuit,p2,n2)
-				if asec1.isValid:
-					loft_inp.loftSections.add(asec1)
-				if asec2.isValid:
-					loft_inp.loftSections.add(asec2)
-			loft_inp.centerLineOrRails.addCenterLine(skel_path)
-			loft_inp.isSolid = True
-			circuit._comp.features.loftFeatures.add(loft_inp)
-
-		# Draw the segments
-		sketch = circuit._sketch
-		asegs = []
-		for i in range(1,len(pts)):
-			asegs.append(sketch.sketchCurves.sketchLines.addByTwoPoints(
-				pts[i-1].acadPoint3D,pts[i].acadPoint3D))
-		# Fillet the non-colinear points and loft the arcs
-		aarcs = []
-		for i in range(1,len(pts)-1):
-			n1 = pts[i]-pts[i-1] # TODO make this a Pt operation
-			u1 = n1/n1.m
-			n2 = pts[i+1]-pts[i]
-			u2 = n2/n2.m
-			# Fillet and loft arc only if not colinear
-			if not math.isclose(abs(u1.x*u2.x + u1.y*u2.y),1):
-				arc = sketch.sketchCurves.sketchArcs.addFillet(
-					asegs[i-1], asegs[i-1].endSketchPoint.geometry,
-					asegs[i], asegs[i].startSketchPoint.geometry,
-					Rs[i]*circuit.design.units)
-				makeLoft(arc,secs[i],secs[i],n1,n2)
-			# Loft prior segment with new coordinates after filleting
-			makeLoft(asegs[i-1],secs[i-1],secs[i],n1,n1)
-		# Loft final segment
-		n2 = pts[-1]-pts[-2]
-		makeLoft(asegs[-1],secs[-2],secs[-1],n2,n2)
-
-		# Draw endcaps (TBD: 'square' is only axis aligned right now)
-		# TBD: trace_cap is only accurate for RecSec, others make rectangular cap!
-		if self.params['trace_cap'] is 'round':
-			circuit.V(pts[0],zspan=[pts[0].z,pts[0].z+secs[0].H],
-				via_R=secs[0].span/2)
-			circuit.V(pts[-1],zspan=[pts[-1].z,pts[-1].z+secs[-1].H],
-				via_R=secs[-1].span/2)
-		elif self.params['trace_cap'] is 'square':
-			circuit.T([pts[0]-(secs[0].span/2,0),pts[0]+(secs[0].span/2,0)],
-				secs=secs[0],trace_cap='none')
-			circuit.T([pts[-1]-(secs[-1].span/2,0),pts[-1]+(secs[-1].span/2,0)],
-				secs=secs[-1],trace_cap='none')
-
-		# Set the pins
-		self.P1 = pts[0]
-		self.P2 = pts[-1]
-		self.C = self.P1 % self.P2
-
-class Via:
-	def __init__(self,circuit,pt,zspan=None,**kwargs):
-		'''Constructor for a via.'''
-		self.circuit = circuit
-		self.pt = Pt(*pt) if isinstance(pt,tuple) else pt
-		pt = self.pt
-		self.params = circuit.params.copy()
-		for key in kwargs: # Overwrite params with kw params
-			if key in self.params.keys():
-				self.params[key] = kwargs[key]
-		self.zspan = [0, self.params['sub_H']] if zspan is None else zspan
-		zspan = self.zspan
-		
-		# Drawing parameters
-		R = self.params['via_R']
-		start = Pt(pt.x,pt.y,zspan[0])
-		end = Pt(pt.x,pt.y,zspan[1])
-
-		# Draw the cylinder (using loft)
-		sketch = circuit._sketch
-		cir1 = adsk.core.ObjectCollection.create()
-		cir1.add(sketch.sketchCurves.sketchCircles.addByCenterRadius(
-				start.acadPoint3D, R*circuit.design.units))
-		cir2 = adsk.core.ObjectCollection.create()
-		cir2.add(sketch.sketchCurves.sketchCircles.addByCenterRadius(
-				end.acadPoint3D, R*circuit.design.units))
-		loft_inp = circuit._comp.features.loftFeatures.createInput(
-			adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
-		loft_inp.loftSections.add(circuit._comp.features.createPath(cir1))
-		loft_inp.loftSections.add(circuit._comp.features.createPath(cir2))
-		loft_inp.isSolid = True
-		circuit._comp.features.loftFeatures.add(loft_inp)
-
-		# Set the pin
-		self.C = pt
-
-class Port:
-	def __init__(self,circuit,pt,zspan=None,**kwargs):
-		'''Constructor for a port (a via with a barb).'''
-		self.circuit = circuit
-		self.pt = Pt(*pt) if isinstance(pt,tuple) else pt
-		pt = self.pt
-		self.params = circuit.params.copy()
-		for key in kwargs: # Overwrite params with kw params
-			if key in self.params.keys():
-				self.params[key] = kwargs[key]
-		
-		# Drawing parameters
-		H = self.params['sub_H'] # Top of the chip
-		R = self.params['via_R'] # Inner radius of barb
-		R0 = 900 # Tapered outer radius of barb
-		R1 = 1100 # Flared outer radius of barb
-		R2 = 2250 # Space for outer radius of tubing
-		taper = 1000 # How long is the taper
-
-		# Create pointlist for the sketch (0,0 is top along centerline)
-		pr = [R0, R1, R0, R0, (R0+R2)/2, R2, R2]
-		pz = [0, -taper, -taper, -taper*2, -taper*2-(R2-R0)/2,-taper*2,0]
-		# Flip z if zspan is negative
-		if zspan is not None and (zspan[0]+zspan[1]) <0:
-			pz = [-z for z in pz]
-			H = -H
-		pts = [pt+Pt(pr[i],0,H+pz[i]) for i in range(len(pr))]
-		# Draw the sketch of the removed section
-		collection = adsk.core.ObjectCollection.create()
-		for i in range(len(pts)):
-			collection.add(circuit._sketch.sketchCurves.sketchLines
-				.addByTwoPoints(pts[i-1].acadPoint3D,pts[i].acadPoint3D))
-		path = circuit._comp.features.createPath(collection)
-
-		# Create the axis to revolve around
-		ax = [pt,pt+Pt(0,0,H)] # Axis to revolve around
-		axis = circuit._sketch.sketchCurves.sketchLines.addByTwoPoints(
-			ax[0].acadPoint3D,ax[1].acadPoint3D)
-		# Revolve
-		rev_inp = circuit._comp.features.revolveFeatures.createInput(
-			path, axis,
-			adsk.fusion.FeatureOperations.NewComponentFeatureOperation)
-		rev_inp.setAngleExtent(False,
-			adsk.core.ValueInput.createByReal(2*math.pi))
-		circuit._comp.features.revolveFeatures.add(rev_inp)
-
-		# Add the lumen as a via
-		circuit.V(pt,zspan=zspan,**kwargs)
-
-		# Set the pin
-		self.C = pt
-
-class Transistor:
-	def __init__(self,circuit,pt,anchor='C',rotation=0,invert=False,**kwargs):
-		'''Constructor for transistor.'''
-		# Oriented such that channel is UD and gate is LR.
-		self.circuit = circuit
-		self.pt = Pt(*pt) if isinstance(pt,tuple) else pt
-		pt = self.pt
-		self.anchor = anchor
-		self.rotation = rotation
-		self.invert = invert # If true, flip each channel section in Z
-		self.params = circuit.params.copy()
-		for key in kwargs: # Overwrite params with kw params
-			if key in self.params.keys():
-				self.params[key] = kwargs[key]
-
-		# Drawing parameters
-		self.chan_sec = self.params['chan_sec']
-		self.gate_sec = self.params['gate_sec']
-		if invert: # TBD: Make inversion a method which returns a new sec
-			self.chan_sec = copy.deepcopy(self.chan_sec)
-			self.chan_sec.H *= -1
-			self.gate_sec = copy.deepcopy(self.gate_sec)
-			self.gate_sec.H *= -1
-		slop = self.params['slop']
-		L = self.gate_sec.span
-		W = self.chan_sec.span
-		H = self.chan_sec.H
-
-		# Compute draw points
-		points = [Pt(), Pt(0,L/2+slop), Pt(0,-L/2-slop),
-			Pt(-W/2-slop,0), Pt(W/2+slop,0),
-			Pt(0,L/2),Pt(0,-L/2)]
-		anchors = ['C','S','D','G1','G2','P1','P2']
-		a = points[anchors.index(anchor)]
-		# Center over anchor
-		points = [point - a for point in points]
-		# Rotate and shift as needed
-		points = [pt+point.rotate(rotation) for point in points]
-
-		# Draw
-		circuit.T([points[1],points[5],points[6],points[2]],
-			secs=self.chan_sec,trace_cap='none')
-		circuit.T([points[3],points[4]],secs=self.gate_sec,trace_cap='none')
-
-		# Set the pins
-		self.C = points[0]
-		self.S = points[1]
-		self.D = points[2]
-		self.G1 = points[3]
-		self.G2 = points[4]
-		self.P1 = points[5]
-		self.P2 = points[6]
-
-class Resistor:
-	def __init__(self,circuit,pt,val,anchor='L',rotation=0,justify='left',**kwargs):
-		'''Constructor for transistor.'''
-		self.circuit = circuit
-		self.pt = Pt(*pt) if isinstance(pt,tuple) else pt
-		pt = self.pt
-		self.anchor = anchor
-		self.rotation = rotation
-		self.params = circuit.params.copy()
-		for key in kwargs: # Overwrite params with kw params
-			if key in self.params.keys():
-				self.params[key] = kwargs[key]
-		self.val = val
-		self.justify = justify
-
-		# Drawing parameters
-		MU = self.params['fluid_Mu']
-		L = self.params['res_L']
-		R_sec = self.params['res_sec']
-		T_sec = self.params['trace_sec']
-		if R_sec.H < 0:# TBD: Make inversion a method which returns a new sec
-			T_sec = copy.deepcopy(T_sec)
-			T_sec.H *= -1
-		R = R_sec.span
-		T = T_sec.span
-
-		# Compute the number of wiggles that fit
-		n = math.floor((L-T)//(R*4))
-		# Compute the centerline distance with minimum wiggle amplitude
-		wiggle_dist = n*(2*R + math.pi*R)
-		# Compute the the wedge distances for entry and exit
-		wedge_dist = (L-(n*R*4))/2
-		# Compute the resistance with minimum wiggle amplitude
-		min_res = MU * (R_sec.res_muL*wiggle_dist
-			+ (R_sec.res_muL+T_sec.res_muL)*wedge_dist)
-		min_res *= 1e-18 # Convert from 1/(m^4)*Pa*s*um to kPa*s/ul
-		rem_res = val - min_res # Res to be gained in wiggle amplitude
-		assert rem_res > 0, "Resistance too small."
-		wiggle_amp = rem_res / (MU*R_sec.res_muL*n*2) * 1e18 # um
-
-		# Place points
-		points = [Pt()]
-		secs = [T_sec]
-		last_pt = Pt()+((L - (n*R*4))/2 ,0)
-		points.append(last_pt) # Inlet wedge
-		secs.append(R_sec)
-		for i in range(n):
-			wiggle = [
-				last_pt+(R,0),
-				last_pt+(R,R+wiggle_amp),
-				last_pt+(3*R,R+wiggle_amp),
-				last_pt+(3*R,0),
-				last_pt+(4*R,0)]
-			points += wiggle # Add the new wiggle
-			secs += [R_sec for i in range(len(wiggle))]
-			last_pt = wiggle[-1]
-		points.append(Pt(L,0)) # Outlet wedge
-		secs.append(T_sec)
-
-		# Flip if justified right
-		if justify is 'right':
-			points = [Pt(point.x,-point.y,point.z) for point in points]
-
-		# Determine anchor
-		anchor_pts = [Pt(), Pt(L/2,0), Pt(L,0)]
-		anchors = ['L','C','R']
-		a = anchor_pts[anchors.index(anchor)]
-		# Center over anchor
-		points = [point - a for point in points]
-		# Rotate and shift as needed
-		points = [pt+point.rotate(rotation) for point in points]
-
-		# Draw
-		circuit.T(points,secs=secs,trace_R=R*.75,
-			trace_cap=self.params['res_cap'])
-
-		# Set the pins
-		self.L = points[0]
-		self.R = points[-1]
-		self.C = self.L%self.R
-class Text:
-	def __init__(self,circuit,pt,text,zspan=None,size=300,**kwargs):
-		'''Constructor for text.'''
-		self.circuit = circuit
-		self.pt = Pt(*pt) if isinstance(pt,tuple) else pt
-		pt = self.pt
-		self.text = text
-		self.size = size
-		self.params = circuit.params.copy()
-		for key in kwargs: # Overwrite params with kw params
-			if key in self.params.keys():
-				self.params[key] = kwargs[key]
-		self.zspan = [0, self.params['sub_H']] if zspan is None else zspan
-
-		endpt = pt + (1e5,1) # Global word wrap at 10cm long
-		texts = circuit._sketch.sketchTexts
-		inp = texts.createInput2(text,size*circuit.design.units) # Size in cm from size in um
-		inp.setAsMultiLine(pt.acadPoint3D,endpt.acadPoint3D,
-			adsk.core.HorizontalAlignments.LeftHorizontalAlignment,
-			adsk.core.VerticalAlignments.TopVerticalAlignment, 0)
-		inp.fontName = 'Lucida Console'
-		inp.textStyle = 5 #BoldUnderline (TBD: Doesnt work)
-		sketch_text = texts.add(inp)
-		if zspan[1] != 0:
-			distup = adsk.core.ValueInput.createByReal(zspan[1]*circuit.design.units)
-			circuit._comp.features.extrudeFeatures.addSimple(sketch_text, distup, adsk.fusion.FeatureOperations.NewBodyFeatureOperation) 
-		if zspan[0] != 0:
-			distdown = adsk.core.ValueInput.createByReal(zspan[0]*circuit.design.units)
-			circuit._comp.features.extrudeFeatures.addSimple(sketch_text, distdown, adsk.fusion.FeatureOperations.NewBodyFeatureOperation) 
+'''
+Elements classes.
+'''
+import math
+import hashlib
+
+from .base import *
+from .point import *
+from .section import *
+from .geometry import *
+
+class Element:
+	'''Base class for circuit elements, planned as primitives by plan().'''
+	instanceable = False # Whether copies can share one Fusion component
+	pins = () # Names of the points of the element other elements connect to
+	terminals = () # Pins which are left dangling if nothing connects to them
+
+	def __init__(self,circuit,**kwargs):
+		self.circuit = circuit
+		self.params = circuit.params.copy()
+		for key in kwargs: # Overwrite params with kw params
+			if key in self.params.keys():
+				self.params[key] = kwargs[key]
+		self.parts = [] # Daughter elements drawn along with this one
+		self.mode = circuit.design.mode # Level of detail of the primitives
+		self.source = None # (file, line) of the script which added it
+		self._prims = None # Planned primitives, computed on first use
+		self._issues = None # Problems found by check(), on first use
+
+	def plan(self):
+		'''Return the primitives of the element and all of its parts.'''
+		if self._prims is None:
+			prims = self._plan()
+			for part in self.parts:
+				prims = prims + part.plan()
+			self._prims = detail(prims,self.mode)
+		return self._prims
+
+	def _plan(self):
+		'''Return the primitives owned directly by this element.'''
+		return []
+
+	def check(self):
+		'''Return (level, message) of every problem of the element and its parts.'''
+		if self._issues is None:
+			issues = self._check()
+			if not any(level == 'error' for level,message in issues):
+				# Problems of the parts would only follow from errors
+				for part in self.parts:
+					issues += [(level,'{} part: {}'.format(
+						type(part).__name__,message))
+						for level,message in part.check()]
+			self._issues = issues
+		return self._issues
+
+	def _check(self):
+		'''Return the problems of this element alone, found without drawing.'''
+		return []
+
+	def wires(self):
+		'''Return the paths, as lists of points, connecting every pin on them.'''
+		return []
+
+	def key(self):
+		'''Return a hashable key of the element type and its geometry.'''
+		return (type(self).__name__,)+tuple(prim.key() for prim in self.plan())
+
+	def content_hash(self):
+		'''Return a hash of key() which is stable between runs.'''
+		return hashlib.sha1(repr(self.key()).encode()).hexdigest()
+
+	def __getstate__(self):
+		'''Drop the circuit, and with it the backend, to plan in other processes.'''
+		state = self.__dict__.copy()
+		state['circuit'] = None
+		return state
+
+	def draw(self):
+		'''Draw the element and all of its parts with the design backend.'''
+		self.circuit.design.backend.draw(self.circuit,self)
+
+class Trace(Element):
+	pins = ('P1','P2') # C is the chord midpoint, not on the path
+	terminals = ('P1','P2')
+	def __init__(self,circuit,pts,secs=None,**kwargs):
+		'''Constructor for a trace.'''
+		super().__init__(circuit,**kwargs)
+		self.pts = [Pt(*pt) if isinstance(pt,tuple) else pt for pt in pts]
+		pts = self.pts
+		if secs is None: # Use default if no sections are passed
+			secs = circuit.params['trace_sec']
+		if isinstance(secs,Section): # Expand sections to fill list
+			secs = [secs for i in range(len(pts))]
+		tol = fab_tol(self.params,None)
+		if tol is not None: # Only as detailed as the printer resolves
+			secs = [sec.resolve(tol) for sec in secs]
+		self.secs = secs
+
+		# Drawing parameters
+		eps = 1e-3
+		Rs = self.params['trace_R']
+		if not isinstance(Rs,list):
+			Rs = [Rs for i in range(len(pts))]
+		# Avoid self-intersections by ensuring R>sec.span/2
+		self.Rs = [max(Rs[i],secs[i].span/2+eps) for i in range(len(pts))]
+
+		# Add endcaps (TBD: 'square' is only axis aligned right now)
+		# TBD: trace_cap is only accurate for RecSec, others make rectangular cap!
+		if self.params['trace_cap'] == 'round':
+			self.parts.append(Via(circuit,pts[0],
+				zspan=[pts[0].z,pts[0].z+secs[0].H],via_R=secs[0].span/2))
+			self.parts.append(Via(circuit,pts[-1],
+				zspan=[pts[-1].z,pts[-1].z+secs[-1].H],via_R=secs[-1].span/2))
+		elif self.params['trace_cap'] == 'square':
+			self.parts.append(Trace(circuit,
+				[pts[0]-(secs[0].span/2,0),pts[0]+(secs[0].span/2,0)],
+				secs=secs[0],trace_cap='none'))
+			self.parts.append(Trace(circuit,
+				[pts[-1]-(secs[-1].span/2,0),pts[-1]+(secs[-1].span/2,0)],
+				secs=secs[-1],trace_cap='none'))
+
+		# Set the pins
+		self.P1 = pts[0]
+		self.P2 = pts[-1]
+		self.C = self.P1 % self.P2
+
+	def _plan(self):
+		'''Loft the filleted segments of the simplified path.'''
+		eps = fab_tol(self.params,1e-3) # Closer points are not resolved
+		lofts = trace_lofts(*simplify_path(self.pts,self.secs,self.Rs,eps))
+		if self.params['trace_join'] and len(lofts) > 1:
+			return [TraceBody(lofts)] # All segments as one body
+		return lofts
+
+	def wires(self):
+		return [self.pts]
+
+	def _check(self):
+		'''Check degenerate segments, sections and fillets that do not fit.'''
+		issues = []
+		pts = self.pts
+		for i in range(1,len(pts)):
+			if (pts[i]-pts[i-1]).m <= 1e-3:
+				issues.append(('warning','points {} and {} coincide, the segment '
+					'between them is dropped'.format(i-1,i)))
+		for i,sec in enumerate(self.secs):
+			if getattr(sec,'H',None) == 0:
+				issues.append(('error','section {} has zero height'.format(i)))
+		Rs = self.params['trace_R']
+		if not isinstance(Rs,list):
+			Rs = [Rs for i in range(len(pts))]
+		for i in range(1,len(pts)-1):
+			if Rs[i] < self.secs[i].span/2:
+				issues.append(('warning','trace_R {:.6g} at point {} is less than '
+					'half the section width {:.6g} and is raised to fit'.format(
+					Rs[i],i,self.secs[i].span)))
+		# Each segment must fit the fillets at both of its ends
+		pts, secs, Rs = simplify_path(pts,self.secs,self.Rs,
+			fab_tol(self.params,1e-3))
+		cuts = [0 for pt in pts] # Length of the segments taken by each fillet
+		for i in range(1,len(pts)-1):
+			f = fillet(pts[i-1],pts[i],pts[i+1],Rs[i])
+			if f is not None:
+				cuts[i] = (pts[i]-f[0]).m
+		for i in range(1,len(pts)):
+			length = (pts[i]-pts[i-1]).m
+			if cuts[i-1]+cuts[i] > length+1e-6:
+				issues.append(('error','segment from ({:.6g}, {:.6g}) to '
+					'({:.6g}, {:.6g}) is {:.6g} long but its fillets need '
+					'{:.6g}'.format(pts[i-1].x,pts[i-1].y,pts[i].x,pts[i].y,
+					length,cuts[i-1]+cuts[i])))
+		return issues
+
+class Via(Element):
+	pins = ('C',)
+	terminals = ('C',)
+	def __init__(self,circuit,pt,zspan=None,**kwargs):
+		'''Constructor for a via.'''
+		super().__init__(circuit,**kwargs)
+		self.pt = Pt(*pt) if isinstance(pt,tuple) else pt
+		pt = self.pt
+		self.zspan = [0, self.params['sub_H']] if zspan is None else zspan
+
+		# Set the pin
+		self.C = pt
+
+	def _plan(self):
+		'''Draw the cylinder.'''
+		return [Cylinder(self.pt,self.params['via_R'],self.zspan)]
+
+	def wires(self):
+		return [[Pt(self.pt.x,self.pt.y,z) for z in self.zspan]]
+
+	def _check(self):
+		issues = _check_zspan(self.zspan)
+		if self.params['via_R'] <= 0:
+			issues.append(('error','via_R {} is not positive'.format(
+				self.params['via_R'])))
+		return issues
+
+class Port(Element):
+	instanceable = True
+	pins = ('C',)
+	terminals = ('C',)
+	def __init__(self,circuit,pt,zspan=None,**kwargs):
+		'''Constructor for a port (a via with a barb).'''
+		super().__init__(circuit,**kwargs)
+		self.pt = Pt(*pt) if isinstance(pt,tuple) else pt
+		pt = self.pt
+		self.zspan = zspan
+
+		# Add the lumen as a via
+		self.parts.append(Via(circuit,pt,zspan=zspan,**kwargs))
+
+		# Set the pin
+		self.C = pt
+
+	def _plan(self):
+		'''Revolve the barb.'''
+		H = self.params['sub_H'] # Top of the chip
+		zspan = self.zspan
+		# Flip z if zspan is negative
+		flip = zspan is not None and (zspan[0]+zspan[1]) <0
+		pts, axis = port_profile(self.pt,H,flip)
+		return [Revolve(pts,axis)]
+
+	def wires(self):
+		return self.parts[0].wires() # The lumen
+
+	def _check(self):
+		return [] if self.zspan is None else _check_zspan(self.zspan)
+
+class Transistor(Element):
+	instanceable = True
+	pins = ('C','S','D','G1','G2','P1','P2')
+	terminals = ('S','D','G1','G2')
+	def __init__(self,circuit,pt,anchor='C',rotation=0,invert=False,**kwargs):
+		'''Constructor for transistor.'''
+		# Oriented such that channel is UD and gate is LR.
+		super().__init__(circuit,**kwargs)
+		self.pt = Pt(*pt) if isinstance(pt,tuple) else pt
+		pt = self.pt
+		self.anchor = anchor
+		self.rotation = rotation
+		self.invert = invert # If true, flip each channel section in Z
+
+		# Drawing parameters
+		self.chan_sec = self.params['chan_sec']
+		self.gate_sec = self.params['gate_sec']
+		if invert:
+			self.chan_sec = self.chan_sec.invert()
+			self.gate_sec = self.gate_sec.invert()
+		slop = self.params['slop']
+		L = self.gate_sec.span
+		W = self.chan_sec.span
+		H = self.chan_sec.H
+
+		# Compute draw points
+		points = PointArray([Pt(), Pt(0,L/2+slop), Pt(0,-L/2-slop),
+			Pt(-W/2-slop,0), Pt(W/2+slop,0),
+			Pt(0,L/2),Pt(0,-L/2)])
+		anchors = ['C','S','D','G1','G2','P1','P2']
+		a = points[anchors.index(anchor)]
+		# Center over anchor, then rotate and shift as needed
+		points = list(pt+(points-a).rotate(rotation))
+
+		# Channel and gate traces
+		self.parts.append(Trace(circuit,[points[1],points[5],points[6],points[2]],
+			secs=self.chan_sec,trace_cap='none'))
+		self.parts.append(Trace(circuit,[points[3],points[4]],
+			secs=self.gate_sec,trace_cap='none'))
+
+		# Set the pins
+		self.C = points[0]
+		self.S = points[1]
+		self.D = points[2]
+		self.G1 = points[3]
+		self.G2 = points[4]
+		self.P1 = points[5]
+		self.P2 = points[6]
+
+class Resistor(Element):
+	instanceable = True
+	pins = ('L','R') # C is between them, not on the meander
+	terminals = ('L','R')
+	def __init__(self,circuit,pt,val,anchor='L',rotation=0,justify='left',**kwargs):
+		'''Constructor for transistor.'''
+		super().__init__(circuit,**kwargs)
+		self.pt = Pt(*pt) if isinstance(pt,tuple) else pt
+		pt = self.pt
+		self.anchor = anchor
+		self.rotation = rotation
+		self.val = val
+		self.justify = justify
+
+		# Drawing parameters
+		MU = self.params['fluid_Mu']
+		L = self.params['res_L']
+		R_sec = self.params['res_sec']
+		T_sec = self.params['trace_sec']
+		if R_sec.H < 0:
+			T_sec = T_sec.invert()
+		R = R_sec.span
+		T = T_sec.span
+
+		# Compute the number of wiggles that fit
+		n = max(0,math.floor((L-T)//(R*4)))
+		# Compute the centerline distance with minimum wiggle amplitude
+		wiggle_dist = n*(2*R + math.pi*R)
+		# Compute the the wedge distances for entry and exit
+		wedge_dist = (L-(n*R*4))/2
+		# Compute the resistance with minimum wiggle amplitude
+		min_res = MU * (R_sec.res_muL*wiggle_dist
+			+ (R_sec.res_muL+T_sec.res_muL)*wedge_dist)
+		min_res *= 1e-18 # Convert from 1/(m^4)*Pa*s*um to kPa*s/ul
+		rem_res = val - min_res # Res to be gained in wiggle amplitude
+		self.n = n # Number of wiggles
+		self.min_res = min_res
+		if n < 1 or rem_res <= 0: # Found by check(), drawn as small as it gets
+			wiggle_amp = 0
+		else:
+			wiggle_amp = rem_res / (MU*R_sec.res_muL*n*2) * 1e18 # um
+
+		# Place points (entry, n wiggles of 5 points each, exit)
+		x0 = (L - (n*R*4))/2 # Inlet wedge
+		dx = [R,R,3*R,3*R,4*R]
+		dy = [0,R+wiggle_amp,R+wiggle_amp,0,0]
+		xs = [0,x0] + [x0+4*R*i+dx[j] for i in range(n) for j in range(5)] + [L]
+		ys = [0,0] + [dy[j] for i in range(n) for j in range(5)] + [0]
+		points = PointArray.columns(xs,ys,0)
+		secs = [T_sec] + [R_sec for i in range(5*n+1)] + [T_sec]
+
+		# Flip if justified right
+		if justify == 'right':
+			points = points.scale(sy=-1)
+
+		# Determine anchor
+		anchor_pts = [Pt(), Pt(L/2,0), Pt(L,0)]
+		anchors = ['L','C','R']
+		a = anchor_pts[anchors.index(anchor)]
+		# Center over anchor, then rotate and shift as needed
+		points = list(pt+(points-a).rotate(rotation))
+
+		# Serpentine trace
+		self.parts.append(Trace(circuit,points,secs=secs,trace_R=R*.75,
+			trace_cap=self.params['res_cap']))
+
+		# Set the pins
+		self.L = points[0]
+		self.R = points[-1]
+		self.C = self.L%self.R
+
+	def _check(self):
+		'''Check that the meander fits and reaches the resistance.'''
+		if self.n < 1:
+			return [('error','res_L {:.6g} is too short for a single wiggle of '
+				'res_sec'.format(self.params['res_L']))]
+		# The fillets (trace_R of .75 R) at both ends of the sides of each
+		# wiggle take 1.5 R, so the wiggles must be at least R/2 high
+		R_sec = self.params['res_sec']
+		low = self.min_res + (self.params['fluid_Mu']*R_sec.res_muL*self.n*2
+			*R_sec.span/2*1e-18)
+		if self.val < low:
+			return [('error','resistance {:.6g} is below the minimum {:.6g} of '
+				'this res_L and res_sec'.format(self.val,low))]
+		return []
+
+class Text(Element):
+	def __init__(self,circuit,pt,text,zspan=None,size=300,**kwargs):
+		'''Constructor for text.'''
+		super().__init__(circuit,**kwargs)
+		self.pt = Pt(*pt) if isinstance(pt,tuple) else pt
+		self.text = text
+		self.size = size
+		self.zspan = [0, self.params['sub_H']] if zspan is None else zspan
+
+	def _plan(self):
+		'''Extrude the text.'''
+		return [TextBox(self.pt,self.text,self.size,self.zspan)]
+
+	def _check(self):
+		return _check_zspan(self.zspan)
+
+class Copy(Element):
+	def __init__(self,circuit,element,transform):
+		'''A moved or mirrored copy of an element of another circuit.'''
+		super().__init__(circuit)
+		self.element = element
+		self.transform = transform
+		self.pins = element.pins
+		self.terminals = element.terminals
+		for name,value in vars(element).items():
+			if isinstance(value,Pt): # Transform the pins
+				setattr(self,name,transform.point(value))
+
+	def _plan(self):
+		'''Transform the primitives of the original element.'''
+		return [prim.transform(self.transform) for prim in self.element.plan()]
+
+	def wires(self):
+		return [[self.transform.point(pt) for pt in wire]
+			for wire in self.element.wires()]
+
+def _check_zspan(zspan):
+	'''Check that a z span has a start and end that differ.'''
+	if len(zspan) != 2 or not all(math.isfinite(z) for z in zspan):
+		return [('error','zspan {} is not two finite heights'.format(zspan))]
+	if zspan[0] == zspan[1]:
+		return [('error','zspan {} is empty'.format(zspan))]
+	return []
+
+class PinArray(PointArray):
+	'''Pins of an element array, which can also be indexed by (i, j).'''
+	__slots__ = ('shape',)
+
+	def __init__(self,pts,shape):
+		super().__init__(pts)
+		self.shape = shape
+
+	def __getitem__(self,index):
+		if isinstance(index,tuple): # Row major, like the array elements
+			index = index[0]*self.shape[1]+index[1]
+		return super().__getitem__(index)
+
+class ElementArray:
+	'''Equal elements placed by a rectangular or circular pattern.'''
+	def __init__(self,circuit,elements,shape,pattern):
+		self.circuit = circuit
+		self.elements = elements
+		self.shape = shape
+		self.pattern = pattern # ('rectangular',px,py) or ('circular',center,angle)
+		self._pins = {} # PinArrays by pin name, gathered on first use
+
+	def __len__(self):
+		return len(self.elements)
+
+	def __iter__(self):
+		return iter(self.elements)
+
+	def __getitem__(self,index):
+		if isinstance(index,tuple):
+			index = index[0]*self.shape[1]+index[1]
+		return self.elements[index]
+
+	def __getattr__(self,name):
+		if name.startswith('_'):
+			raise AttributeError(name)
+		if name not in self._pins:
+			pts = [getattr(element,name) for element in self.elements]
+			if not all(isinstance(pt,Pt) for pt in pts):
+				raise AttributeError(name)
+			self._pins[name] = PinArray(pts,self.shape)
+		return self._pins[name]
+
+	def draw(self):
+		'''Draw the elements with the design backend.'''
+		self.circuit.design.backend.draw_array(self.circuit,self)
@@ -0,0 +1,778 @@
+'''
+Recording stand-in for the Fusion 360 API.
+
+Implements the part of adsk.core and adsk.fusion used by the Fusion backend,
+without any real geometry, and counts every API call, created entity and
+feature. Call install() before drawing to run designs outside Fusion:
+
+	from microfusion import fake_adsk
+	stats = fake_adsk.install()
+	Amp_Example.main()
+	print(stats.summary())
+'''
+
+import sys
+import math
+import types
+import functools
+import collections
+
+class Stats:
+	'''Counts of API calls, created entities and features by name.'''
+	def __init__(self):
+		self.reset()
+
+	def reset(self):
+		self.calls = collections.Counter() # API calls by Class.method
+		self.entities = collections.Counter() # Created entities by class
+		self.features = collections.Counter() # Created features by class
+		self.messages = [] # Messages shown with messageBox
+
+	def summary(self):
+		'''Return the total number of calls, entities and features.'''
+		return {'calls': sum(self.calls.values()),
+			'entities': sum(self.entities.values()),
+			'features': sum(self.features.values())}
+
+stats = Stats()
+
+def _api(f):
+	'''Count every call of an API method.'''
+	name = f.__qualname__
+	@functools.wraps(f)
+	def call(*args,**kwargs):
+		stats.calls[name] += 1
+		return f(*args,**kwargs)
+	return call
+
+class _Entity:
+	'''An object of the Fusion document, counted when created.'''
+	def __init__(self):
+		stats.entities[type(self).__name__] += 1
+		self.isValid = True
+
+	@_api
+	def deleteMe(self):
+		self.isValid = False
+		return True
+
+class _List:
+	'''A read only Fusion collection.'''
+	def __init__(self,items=None):
+		self._items = [] if items is None else items
+
+	@property
+	def count(self):
+		return len(self._items)
+
+	@_api
+	def item(self,i):
+		return self._items[i]
+
+
+## adsk.core
+class Point3D:
+	def __init__(self,x,y,z):
+		self.x = x
+		self.y = y
+		self.z = z
+
+	@staticmethod
+	@_api
+	def create(x=0,y=0,z=0):
+		return Point3D(x,y,z)
+
+class Vector3D(Point3D):
+	@staticmethod
+	@_api
+	def create(x=0,y=0,z=0):
+		return Vector3D(x,y,z)
+
+class Matrix3D:
+	def __init__(self):
+		self.translation = Vector3D(0,0,0)
+
+	@staticmethod
+	@_api
+	def create():
+		return Matrix3D()
+
+	@_api
+	def setToRotation(self,angle,axis,origin):
+		self.rotation = (angle,axis,origin)
+		return True
+
+	@_api
+	def transformBy(self,matrix):
+		t = self.translation
+		self.translation = Vector3D(t.x+matrix.translation.x,
+			t.y+matrix.translation.y,t.z+matrix.translation.z)
+		return True
+
+class Plane:
+	def __init__(self,origin,normal):
+		self.origin = origin
+		self.normal = normal
+
+	@staticmethod
+	@_api
+	def create(origin,normal):
+		return Plane(origin,normal)
+
+class InfiniteLine3D:
+	def __init__(self,origin,direction):
+		self.origin = origin
+		self.direction = direction
+
+	@staticmethod
+	@_api
+	def create(origin,direction):
+		return InfiniteLine3D(origin,direction)
+
+class ValueInput:
+	def __init__(self,value):
+		self.realValue = value
+
+	@staticmethod
+	@_api
+	def createByReal(value):
+		return ValueInput(value)
+
+class ObjectCollection(_List):
+	@staticmethod
+	@_api
+	def create():
+		return ObjectCollection()
+
+	@_api
+	def add(self,obj):
+		self._items.append(obj)
+		return True
+
+class HorizontalAlignments:
+	LeftHorizontalAlignment = 0
+	CenterHorizontalAlignment = 1
+	RightHorizontalAlignment = 2
+
+class VerticalAlignments:
+	TopVerticalAlignment = 0
+	MiddleVerticalAlignment = 1
+	BottomVerticalAlignment = 2
+
+class UserInterface:
+	@_api
+	def messageBox(self,message,*args):
+		stats.messages.append(message)
+		return 0
+
+class Application:
+	_app = None # The running application, created on first use
+
+	def __init__(self):
+		self.userInterface = UserInterface()
+		self.activeProduct = Design()
+
+	@staticmethod
+	@_api
+	def get():
+		if Application._app is None:
+			Application._app = Application()
+		return Application._app
+
+
+## adsk.fusion
+class DesignTypes:
+	ParametricDesignType = 0
+	DirectDesignType = 1
+
+class FeatureOperations:
+	JoinFeatureOperation = 0
+	CutFeatureOperation = 1
+	IntersectFeatureOperation = 2
+	NewBodyFeatureOperation = 3
+	NewComponentFeatureOperation = 4
+
+class PatternDistanceType:
+	ExtentPatternDistanceType = 0
+	SpacingPatternDistanceType = 1
+
+class SweepOrientationTypes:
+	PerpendicularOrientationType = 0
+	ParallelOrientationType = 1
+
+class Design:
+	def __init__(self):
+		self.designType = DesignTypes.ParametricDesignType
+		self.rootComponent = Component()
+
+	@staticmethod
+	@_api
+	def cast(product):
+		return product if isinstance(product,Design) else None
+
+class Attributes:
+	def __init__(self):
+		self._items = {}
+
+	@_api
+	def add(self,group,name,value):
+		attribute = self._items[group,name] = Attribute(group,name,value)
+		return attribute
+
+	@_api
+	def itemByName(self,group,name):
+		return self._items.get((group,name))
+
+class Attribute:
+	def __init__(self,group,name,value):
+		self.groupName = group
+		self.name = name
+		self.value = value
+
+class Component(_Entity):
+	def __init__(self):
+		super().__init__()
+		self.name = ''
+		self.attributes = Attributes()
+		self.occurrences = Occurrences()
+		self.sketches = Sketches()
+		self.constructionPlanes = ConstructionPlanes()
+		self.xYConstructionPlane = ConstructionPlane(
+			Plane(Point3D(0,0,0),Vector3D(0,0,1)))
+		self._planes = {} # Other origin planes, by name
+		self.constructionAxes = ConstructionAxes()
+		self.features = Features(self)
+		self.bRepBodies = _List()
+
+	# Origin planes other than XY and origin axes are only created when used,
+	# to keep entity counts unchanged
+	@property
+	def yZConstructionPlane(self):
+		return self._plane('yZ',Vector3D(1,0,0))
+
+	@property
+	def xZConstructionPlane(self):
+		return self._plane('xZ',Vector3D(0,1,0))
+
+	def _plane(self,name,normal):
+		if name not in self._planes:
+			self._planes[name] = ConstructionPlane(Plane(Point3D(0,0,0),normal))
+		return self._planes[name]
+
+	@property
+	def xConstructionAxis(self):
+		return ConstructionAxis()
+
+	@property
+	def yConstructionAxis(self):
+		return ConstructionAxis()
+
+	@property
+	def zConstructionAxis(self):
+		return ConstructionAxis()
+
+class Occurrence(_Entity):
+	def __init__(self,parent,component,transform):
+		super().__init__()
+		self._parent = parent
+		self.component = component
+		self.transform = transform
+
+	@property
+	def bRepBodies(self):
+		return self.component.bRepBodies
+
+	@property
+	def childOccurrences(self):
+		return self.component.occurrences
+
+	@_api
+	def deleteMe(self):
+		self._parent._items.remove(self)
+		self.isValid = False
+		return True
+
+class Occurrences(_List):
+	@_api
+	def addNewComponent(self,transform):
+		return self.addExistingComponent(Component(),transform)
+
+	@_api
+	def addExistingComponent(self,component,transform):
+		occ = Occurrence(self,component,transform)
+		self._items.append(occ)
+		return occ
+
+class ConstructionPlane(_Entity):
+	def __init__(self,geometry=None):
+		super().__init__()
+		self.geometry = geometry
+
+class ConstructionPlaneInput:
+	@_api
+	def setByPlane(self,plane):
+		self.plane = plane
+		return True
+
+class ConstructionPlanes(_List):
+	@_api
+	def createInput(self):
+		return ConstructionPlaneInput()
+
+	@_api
+	def add(self,inp):
+		plane = ConstructionPlane(inp.plane)
+		self._items.append(plane)
+		return plane
+
+class ConstructionAxis(_Entity):
+	pass
+
+class ConstructionAxisInput:
+	@_api
+	def setByLine(self,line):
+		self.line = line
+		return True
+
+class ConstructionAxes(_List):
+	@_api
+	def createInput(self):
+		return ConstructionAxisInput()
+
+	@_api
+	def add(self,inp):
+		axis = ConstructionAxis()
+		self._items.append(axis)
+		return axis
+
+
+## Sketches
+class Profile(_Entity):
+	def __init__(self,pts):
+		'''A closed loop of the sketch, through points in sketch space.'''
+		super().__init__()
+		self.boundingBox = BoundingBox3D(
+			Point3D(*(min(getattr(p,c) for p in pts) for c in 'xyz')),
+			Point3D(*(max(getattr(p,c) for p in pts) for c in 'xyz')))
+
+class SketchCurve(_Entity):
+	pass
+
+class SketchLine(SketchCurve):
+	pass
+
+class SketchArc(SketchCurve):
+	pass
+
+class SketchCircle(SketchCurve):
+	pass
+
+class SketchText(_Entity):
+	pass
+
+class SketchLines:
+	def __init__(self,sketch):
+		self._sketch = sketch
+
+	@_api
+	def addByTwoPoints(self,p1,p2):
+		return self._sketch._add(SketchLine(),[p1,p2])
+
+class SketchArcs(SketchLines):
+	@_api
+	def addByThreePoints(self,p1,pm,p2):
+		return self._sketch._add(SketchArc(),[p1,pm,p2])
+
+class SketchCircles(SketchLines):
+	@_api
+	def addByCenterRadius(self,center,R):
+		self._sketch.profiles._items.append(Profile( # Each is a profile
+			[Point3D(center.x-R,center.y-R,center.z),
+			Point3D(center.x+R,center.y+R,center.z)]))
+		return SketchCircle()
+
+class SketchCurves:
+	def __init__(self,sketch):
+		self.sketchLines = SketchLines(sketch)
+		self.sketchArcs = SketchArcs(sketch)
+		self.sketchCircles = SketchCircles(sketch)
+
+class SketchTextInput:
+	def __init__(self,text,height):
+		self.text = text
+		self.height = height
+		self.fontName = ''
+		self.textStyle = 0
+
+	@_api
+	def setAsMultiLine(self,p1,p2,halign,valign,spacing):
+		return True
+
+class SketchTexts:
+	@_api
+	def createInput2(self,text,height):
+		return SketchTextInput(text,height)
+
+	@_api
+	def add(self,inp):
+		return SketchText()
+
+class Sketch(_Entity):
+	def __init__(self,plane):
+		super().__init__()
+		self.referencePlane = plane
+		self.isComputeDeferred = False
+		self.areProfilesShown = True
+		self.isLightBulbOn = True
+		self.sketchCurves = SketchCurves(self)
+		self.sketchTexts = SketchTexts()
+		self.profiles = _List()
+		self._loop = [] # Points of the connected lines and arcs drawn last
+
+	def _add(self,curve,pts):
+		'''Add a line or arc, making a profile when it closes a loop.'''
+		if self._loop and not _same(self._loop[-1],pts[0]):
+			self._loop = []
+		self._loop += pts
+		if len(self._loop) > 2 and _same(self._loop[0],self._loop[-1]):
+			self.profiles._items.append(Profile(self._loop))
+			self._loop = []
+		return curve
+
+	# Sketch space is model space, as there is no geometry to place
+	@_api
+	def modelToSketchSpace(self,point):
+		return point
+
+	@_api
+	def sketchToModelSpace(self,point):
+		return point
+
+	@_api
+	def deleteMe(self):
+		self._sketches._items.remove(self)
+		self.isValid = False
+		return True
+
+def _same(p1,p2,eps=1e-9):
+	return (abs(p1.x-p2.x) <= eps and abs(p1.y-p2.y) <= eps
+		and abs(p1.z-p2.z) <= eps)
+
+class Sketches(_List):
+	@_api
+	def add(self,plane):
+		sketch = Sketch(plane)
+		sketch._sketches = self
+		self._items.append(sketch)
+		return sketch
+
+
+## Features
+class BoundingBox3D:
+	def __init__(self,minPoint=None,maxPoint=None):
+		'''A box, by default containing everything as bodies have no geometry.'''
+		self.minPoint = minPoint or Point3D(-math.inf,-math.inf,-math.inf)
+		self.maxPoint = maxPoint or Point3D(math.inf,math.inf,math.inf)
+
+class BRepBody(_Entity):
+	def __init__(self,component):
+		super().__init__()
+		self._component = component
+		self.boundingBox = BoundingBox3D()
+
+	@_api
+	def deleteMe(self):
+		self._component.bRepBodies._items.remove(self)
+		self.isValid = False
+		return True
+
+class Feature(_Entity):
+	def __init__(self,component,operation):
+		'''A feature creating a new body in the component, or a new component.'''
+		self.isValid = True
+		stats.features[type(self).__name__] += 1
+		if operation == FeatureOperations.NewComponentFeatureOperation:
+			component = component.occurrences.addNewComponent(
+				Matrix3D()).component
+		if operation in (FeatureOperations.NewBodyFeatureOperation,
+			FeatureOperations.NewComponentFeatureOperation):
+			component.bRepBodies._items.append(BRepBody(component))
+
+class LoftFeature(Feature):
+	pass
+
+class SweepFeature(Feature):
+	pass
+
+class ExtrudeFeature(Feature):
+	pass
+
+class RevolveFeature(Feature):
+	pass
+
+class CombineFeature(Feature):
+	pass
+
+class Path(_Entity):
+	def __init__(self,curves):
+		super().__init__()
+		self.curves = curves
+
+class LoftCenterLineOrRails:
+	@_api
+	def addCenterLine(self,path):
+		self.centerLine = path
+		return True
+
+class LoftFeatureInput:
+	def __init__(self,operation):
+		self.operation = operation
+		self.loftSections = ObjectCollection()
+		self.centerLineOrRails = LoftCenterLineOrRails()
+		self.isSolid = False
+
+class LoftFeatures:
+	def __init__(self,component):
+		self._component = component
+
+	@_api
+	def createInput(self,operation):
+		return LoftFeatureInput(operation)
+
+	@_api
+	def add(self,inp):
+		return LoftFeature(self._component,inp.operation)
+
+class SweepFeatureInput:
+	def __init__(self,profile,path,operation):
+		self.profile = profile
+		self.path = path
+		self.operation = operation
+		self.orientation = SweepOrientationTypes.ParallelOrientationType
+
+class SweepFeatures(LoftFeatures):
+	@_api
+	def createInput(self,profile,path,operation):
+		return SweepFeatureInput(profile,path,operation)
+
+	@_api
+	def add(self,inp):
+		return SweepFeature(self._component,inp.operation)
+
+class OffsetStartDefinition:
+	def __init__(self,offset):
+		self.offset = offset
+
+	@staticmethod
+	@_api
+	def create(offset):
+		return OffsetStartDefinition(offset)
+
+class ExtrudeFeatureInput:
+	def __init__(self,profile,operation):
+		self.profile = profile
+		self.operation = operation
+		self.startExtent = None # From the profile plane
+
+	@_api
+	def setDistanceExtent(self,isSymmetric,distance):
+		self.distance = distance
+		return True
+
+class ExtrudeFeatures(LoftFeatures):
+	@_api
+	def createInput(self,profile,operation):
+		return ExtrudeFeatureInput(profile,operation)
+
+	@_api
+	def add(self,inp):
+		return ExtrudeFeature(self._component,inp.operation)
+
+	@_api
+	def addSimple(self,profile,distance,operation):
+		return ExtrudeFeature(self._component,operation)
+
+class RevolveFeatureInput:
+	def __init__(self,profile,axis,operation):
+		self.profile = profile
+		self.axis = axis
+		self.operation = operation
+
+	@_api
+	def setAngleExtent(self,isSymmetric,angle):
+		self.angle = angle
+		return True
+
+class RevolveFeatures(LoftFeatures):
+	@_api
+	def createInput(self,profile,axis,operation):
+		return RevolveFeatureInput(profile,axis,operation)
+
+	@_api
+	def add(self,inp):
+		return RevolveFeature(self._component,inp.operation)
+
+class CombineFeatureInput:
+	def __init__(self,target,tools):
+		self.targetBody = target
+		self.toolBodies = tools
+		self.operation = FeatureOperations.JoinFeatureOperation
+		self.isKeepToolBodies = False
+
+class CombineFeatures(LoftFeatures):
+	@_api
+	def createInput(self,target,tools):
+		return CombineFeatureInput(target,tools)
+
+	@_api
+	def add(self,inp):
+		if not inp.isKeepToolBodies:
+			for i in range(inp.toolBodies.count):
+				inp.toolBodies.item(i).deleteMe()
+		return CombineFeature(self._component,inp.operation)
+
+class RectangularPatternFeature(Feature):
+	pass
+
+class CircularPatternFeature(Feature):
+	pass
+
+class PatternFeatureInput:
+	def __init__(self,entities,axis,quantity=None):
+		self.inputEntities = entities
+		self.axis = axis
+		self.quantity = quantity
+		self.quantityTwo = ValueInput(1)
+
+	@_api
+	def setDirectionTwo(self,axis,quantity,distance):
+		self.quantityTwo = quantity
+		return True
+
+class RectangularPatternFeatures(LoftFeatures):
+	feature = RectangularPatternFeature
+
+	@_api
+	def createInput(self,entities,axis,quantity,distance,distanceType):
+		return PatternFeatureInput(entities,axis,quantity)
+
+	@_api
+	def add(self,inp):
+		'''Place copies of the patterned occurrences.'''
+		n = int(inp.quantity.realValue*inp.quantityTwo.realValue)
+		for i in range(inp.inputEntities.count):
+			occ = inp.inputEntities.item(i)
+			occ._parent._items += [Occurrence(occ._parent,occ.component,Matrix3D())
+				for j in range(n-1)]
+		return self.feature(self._component,None)
+
+class CircularPatternFeatures(RectangularPatternFeatures):
+	feature = CircularPatternFeature
+
+	@_api
+	def createInput(self,entities,axis):
+		return PatternFeatureInput(entities,axis)
+
+class BodiesFeature(Feature):
+	def __init__(self,component,bodies):
+		'''A feature making one new body in the component per input body.'''
+		super().__init__(component,None)
+		self.bodies = _List([BRepBody(component) for i in range(bodies.count)])
+		component.bRepBodies._items += self.bodies._items
+
+class CopyPasteBody(BodiesFeature):
+	pass
+
+class MirrorFeature(BodiesFeature):
+	pass
+
+class MoveFeature(Feature):
+	pass
+
+class CopyPasteBodies(LoftFeatures):
+	@_api
+	def add(self,bodies):
+		return CopyPasteBody(self._component,bodies)
+
+class MirrorFeatureInput:
+	def __init__(self,entities,plane):
+		self.inputEntities = entities
+		self.mirrorPlane = plane
+
+class MirrorFeatures(LoftFeatures):
+	@_api
+	def createInput(self,entities,plane):
+		return MirrorFeatureInput(entities,plane)
+
+	@_api
+	def add(self,inp):
+		return MirrorFeature(self._component,inp.inputEntities)
+
+class MoveFeatureInput:
+	def __init__(self,entities):
+		self.inputEntities = entities
+
+	@_api
+	def defineAsFreeMove(self,transform):
+		self.transform = transform
+		return True
+
+class MoveFeatures(LoftFeatures):
+	@_api
+	def createInput2(self,entities):
+		return MoveFeatureInput(entities)
+
+	@_api
+	def add(self,inp):
+		return MoveFeature(self._component,None)
+
+class Features:
+	def __init__(self,component):
+		self.loftFeatures = LoftFeatures(component)
+		self.sweepFeatures = SweepFeatures(component)
+		self.extrudeFeatures = ExtrudeFeatures(component)
+		self.revolveFeatures = RevolveFeatures(component)
+		self.combineFeatures = CombineFeatures(component)
+		self.rectangularPatternFeatures = RectangularPatternFeatures(component)
+		self.circularPatternFeatures = CircularPatternFeatures(component)
+		self.copyPasteBodies = CopyPasteBodies(component)
+		self.mirrorFeatures = MirrorFeatures(component)
+		self.moveFeatures = MoveFeatures(component)
+
+	@_api
+	def createPath(self,curves):
+		return Path(curves)
+
+
+## Installation
+_core = [Point3D, Vector3D, Matrix3D, Plane, InfiniteLine3D, ValueInput,
+	ObjectCollection,
+	HorizontalAlignments, VerticalAlignments, UserInterface, Application]
+_fusion = [DesignTypes, FeatureOperations, PatternDistanceType,
+	SweepOrientationTypes, OffsetStartDefinition, Design,
+	Component, Occurrence, Sketch, BRepBody]
+
+def _module(name,classes):
+	module = types.ModuleType(name)
+	for cls in classes:
+		setattr(module,cls.__name__,cls)
+	return module
+
+def reset():
+	'''Clear the counts and start a new empty document.'''
+	stats.reset()
+	Application._app = None
+
+def install():
+	'''Install the fake as the adsk package and return its stats.'''
+	adsk = types.ModuleType('adsk')
+	adsk.core = _module('adsk.core',_core)
+	adsk.fusion = _module('adsk.fusion',_fusion)
+	adsk.cam = types.ModuleType('adsk.cam')
+	sys.modules.update({'adsk': adsk, 'adsk.core': adsk.core,
+		'adsk.fusion': adsk.fusion, 'adsk.cam': adsk.cam})
+	for name,module in list(sys.modules.items()): # Imported before the fake
+		if name.startswith(__package__+'.') and hasattr(module,'adsk'):
+			module.adsk = adsk
+	reset()
+	return stats
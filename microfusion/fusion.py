@@ -0,0 +1,590 @@
+'''
+Fusion 360 backend.
+'''
+
+try:
+	import adsk.core, adsk.fusion
+except ImportError: # Running headless outside of Fusion
+	adsk = None
+
+import math
+import time
+import hashlib
+
+from .point import *
+from .geometry import *
+from .backend import *
+
+class Component:
+	'''A Fusion occurrence and its component, drawn into like a Circuit.'''
+	def __init__(self,design,occ):
+		self.design = design
+		self._occ = occ
+		self._comp = occ.component
+
+class Sheet:
+	def __init__(self,cell):
+		'''Closed loops to draw in one sketch, with no two boxes overlapping.'''
+		self.cell = cell # Size of the cells binning the boxes
+		self.loops = [] # List of (curves, box, key) of each loop
+		self.grid = {} # Indices of the loops with a box in each (i, j) cell
+
+	def _cells(self,box):
+		c = self.cell
+		return [(i,j) for i in range(math.floor(box[0]/c),math.floor(box[2]/c)+1)
+			for j in range(math.floor(box[1]/c),math.floor(box[3]/c)+1)]
+
+	def add(self,curves,box,key,gap=1e-3):
+		'''Add a loop unless its box is within gap of another, and return whether.'''
+		grown = (box[0]-gap,box[1]-gap,box[2]+gap,box[3]+gap)
+		cells = self._cells(grown)
+		for cell in cells:
+			for k in self.grid.get(cell,()):
+				b = self.loops[k][1]
+				if (grown[0] <= b[2] and b[0] <= grown[2] and
+					grown[1] <= b[3] and b[1] <= grown[3]):
+					return False
+		for cell in cells:
+			self.grid.setdefault(cell,[]).append(len(self.loops))
+		self.loops.append((curves,box,key))
+		return True
+
+	def find(self,u,v):
+		'''Return the index of the loop whose box contains (u, v), or None.'''
+		c = self.cell
+		for k in self.grid.get((math.floor(u/c),math.floor(v/c)),()):
+			u0, v0, u1, v1 = self.loops[k][1]
+			if u0 <= u <= u1 and v0 <= v <= v1:
+				return k
+		return None
+
+def _axes(normal):
+	'''Return unit vectors spanning the plane normal to a level or vertical direction.'''
+	if abs(normal[2]) > .5:
+		return Pt(1,0,0), Pt(0,1,0)
+	return unit(Pt(-normal[1],normal[0],0)), Pt(0,0,1)
+
+def _box(curves,u,v):
+	'''Return the (u0, v0, u1, v1) box of curves in plane coordinates.'''
+	us, vs = [], []
+	for curve in curves:
+		for p in (curve.p1,curve.p2):
+			us.append(dot(p,u))
+			vs.append(dot(p,v))
+		if isinstance(curve,Arc): # Anywhere within R of its center
+			cu, cv = dot(curve.center,u), dot(curve.center,v)
+			us += [cu-curve.R,cu+curve.R]
+			vs += [cv-curve.R,cv+curve.R]
+	return min(us), min(vs), max(us), max(vs)
+
+class FusionBackend(Backend):
+	def __init__(self):
+		'''Attach to the active Fusion design.'''
+		self.units = Pt().units # Get units from Point class
+
+		# Set up the app
+		self._app = adsk.core.Application.get()
+		self._ui = self._app.userInterface
+		self._product = self._app.activeProduct
+		self._design = adsk.fusion.Design.cast(self._product)
+		# Do not capture design history for speed
+		self._design.designType = adsk.fusion.DesignTypes.DirectDesignType
+		self._root_comp = self._design.rootComponent
+
+		self._instances = {} # Components of instanced elements by geometry
+		self._batches = {} # Loops waiting to be extruded, by circuit and extent
+
+	def add_circuit(self,circuit):
+		'''Create the circuit component and sketchplane.'''
+		circuit._occ = None
+		circuit._stale = {} # Element occurrences of the last run by hash
+		circuit._kept = False # Whether elements of the last run were kept
+		circuit._drawn = False # Whether elements were drawn by this run
+		if circuit.design.incremental: # Reuse the circuit of the last run
+			circuit._occ = self._find(self._root_comp,circuit.name)
+		if circuit._occ is None:
+			circuit._occ = self._root_comp.occurrences.addNewComponent(
+				adsk.core.Matrix3D.create())
+			circuit._occ.component.name = circuit.name
+			circuit._occ.component.attributes.add('microfusion','circuit',
+				circuit.name) # Mark it as ours for clean up
+		else:
+			occs = circuit._occ.component.occurrences
+			for i in range(occs.count):
+				occ = occs.item(i)
+				circuit._stale.setdefault(occ.component.name,[]).append(occ)
+			sketches = circuit._occ.component.sketches
+			for sketch in [sketches.item(i) for i in range(sketches.count)]:
+				sketch.deleteMe() # Left by the last run, replaced below
+		circuit._comp = circuit._occ.component
+		self.new_sketch(circuit)
+
+	def _find(self,comp,name):
+		'''Return the occurrence in comp of a component with a given name.'''
+		occs = comp.occurrences
+		for i in range(occs.count):
+			if occs.item(i).component.name == name:
+				return occs.item(i)
+		return None
+
+	def new_sketch(self,circuit):
+		'''Create a fresh sketch on the circuit (or component) XY plane.'''
+		circuit._sketch = circuit._comp.sketches.add(
+			circuit._comp.xYConstructionPlane)
+		circuit._sketch.isComputeDeferred = True # Saves time evaluating
+		circuit._sketch.areProfilesShown = False # Saves time drawing
+		# Reduce visual clutter, unless the sketch is the preview
+		circuit._sketch.isLightBulbOn = circuit.design.mode == 'preview'
+
+	def clean(self,circuit):
+		'''Deletes the existing sketch and creates a fresh sketch.'''
+		# Fusion becomes much slower the more objects you add to a sketch
+		self.flush(circuit)
+		if circuit.design.mode == 'preview': # The sketch is the drawing
+			return
+		circuit._sketch.deleteMe()
+		self.new_sketch(circuit)
+
+	def flush(self,circuit):
+		'''Extrude the loops queued in a circuit from sketches shared per direction.'''
+		sheets = {} # Sheets of each direction
+		for key,loops in self._batches.pop(circuit,{}).items():
+			u, v = _axes(key[0])
+			for curves in loops:
+				box = _box(curves,u,v)
+				for sheet in sheets.setdefault(key[0],[]):
+					if sheet.add(curves,box,key):
+						break
+				else:
+					sheet = Sheet(max(box[2]-box[0],box[3]-box[1],1))
+					sheet.add(curves,box,key)
+					sheets[key[0]].append(sheet)
+		for normal,group in sheets.items():
+			plane, temporary = self.origin_plane(circuit,normal)
+			for sheet in group:
+				self.extrude_sheet(circuit,plane,normal,sheet)
+			if temporary:
+				plane.deleteMe()
+
+	def draw(self,circuit,element):
+		'''Draw an element, in its own component by content hash if incremental.'''
+		target = circuit
+		if circuit.design.incremental:
+			h = element.content_hash()
+			if circuit._stale.get(h): # Unchanged since the last run
+				circuit._stale[h].pop()
+				circuit._kept = True
+				return
+			circuit._drawn = True
+			target = Component(circuit.design,
+				circuit._comp.occurrences.addNewComponent(
+				adsk.core.Matrix3D.create()))
+			target._comp.name = h
+			self.new_sketch(target)
+		if circuit.design.instancing and element.instanceable:
+			self.instance(target,element)
+		else:
+			self.emit(target,element.plan())
+		if target is not circuit:
+			self.flush(target)
+			target._sketch.deleteMe()
+
+	def instance(self,circuit,element):
+		'''Draw an element as an occurrence of a shared component.'''
+		# Elements with the same geometry relative to their point are equal
+		d = element.pt
+		local = [prim.translate(d*-1) for prim in element.plan()]
+		key = (type(element).__name__,)+tuple(prim.key() for prim in local)
+		transform = adsk.core.Matrix3D.create()
+		transform.translation = adsk.core.Vector3D.create(
+			d.x*self.units,d.y*self.units,d.z*self.units)
+		comp = self._instances.get(key)
+		if comp is None: # First of its kind, draw it in a new component
+			inst = Component(circuit.design,
+				circuit._comp.occurrences.addNewComponent(transform))
+			self.new_sketch(inst)
+			self.emit(inst,local)
+			self.flush(inst)
+			inst._sketch.deleteMe()
+			self._instances[key] = inst._comp
+		else:
+			circuit._comp.occurrences.addExistingComponent(comp,transform)
+
+	def draw_array(self,circuit,array):
+		'''Draw the first element of an array and a pattern of it.'''
+		design = circuit.design
+		if design.incremental or design.mode == 'preview': # One by one
+			return super().draw_array(circuit,array)
+		base = Component(circuit.design,circuit._comp.occurrences.addNewComponent(
+			adsk.core.Matrix3D.create()))
+		self.new_sketch(base)
+		self.emit(base,array.elements[0].plan())
+		self.flush(base)
+		base._sketch.deleteMe()
+		entities = adsk.core.ObjectCollection.create()
+		entities.add(base._occ)
+		comp = circuit._comp
+		value = adsk.core.ValueInput.createByReal
+		if array.pattern[0] == 'rectangular':
+			px, py = array.pattern[1:]
+			nx, ny = array.shape
+			patterns = comp.features.rectangularPatternFeatures
+			inp = patterns.createInput(entities,comp.xConstructionAxis,
+				value(nx),value(px*self.units),
+				adsk.fusion.PatternDistanceType.SpacingPatternDistanceType)
+			inp.setDirectionTwo(comp.yConstructionAxis,
+				value(ny),value(py*self.units))
+		else:
+			center, angle = array.pattern[1:]
+			axes = comp.constructionAxes
+			axis_inp = axes.createInput()
+			axis_inp.setByLine(adsk.core.InfiniteLine3D.create(
+				center.acadPoint3D,adsk.core.Vector3D.create(0,0,1)))
+			patterns = comp.features.circularPatternFeatures
+			inp = patterns.createInput(entities,axes.add(axis_inp))
+			inp.quantity = value(len(array))
+			inp.totalAngle = value(math.radians(angle))
+			inp.isSymmetric = False
+		patterns.add(inp)
+
+	def copy(self,source,circuit,transform):
+		'''Paste the bodies of a circuit into another, then mirror and move them.'''
+		design = circuit.design
+		if design.incremental or design.mode == 'preview': # One by one
+			return super().copy(source,circuit,transform)
+		bodies = adsk.core.ObjectCollection.create()
+		for body in self.bodies(source._occ):
+			bodies.add(body)
+		if not bodies.count:
+			return
+		features = circuit._comp.features
+		bodies = self.collection(features.copyPasteBodies.add(bodies).bodies)
+		if transform.mirror is not None:
+			plane, distance = transform.mirror
+			normal = [0,0,0]
+			normal[Transform._normals[plane]] = 1
+			planes = circuit._comp.constructionPlanes
+			plane_inp = planes.createInput()
+			plane_inp.setByPlane(adsk.core.Plane.create(
+				(Pt(*normal)*distance).acadPoint3D,
+				adsk.core.Vector3D.create(*normal)))
+			inp = features.mirrorFeatures.createInput(bodies,planes.add(plane_inp))
+			mirrored = self.collection(features.mirrorFeatures.add(inp).bodies)
+			for i in range(bodies.count): # Mirroring keeps the pasted bodies
+				bodies.item(i).deleteMe()
+			bodies = mirrored
+		d = transform.offset
+		if transform.rotation or d.m:
+			matrix = adsk.core.Matrix3D.create()
+			matrix.setToRotation(math.radians(transform.rotation),
+				adsk.core.Vector3D.create(0,0,1),transform.center.acadPoint3D)
+			move = adsk.core.Matrix3D.create()
+			move.translation = adsk.core.Vector3D.create(
+				d.x*self.units,d.y*self.units,d.z*self.units)
+			matrix.transformBy(move)
+			inp = features.moveFeatures.createInput2(bodies)
+			inp.defineAsFreeMove(matrix)
+			features.moveFeatures.add(inp)
+
+	def collection(self,items):
+		'''Return the items of a Fusion collection in an ObjectCollection.'''
+		collection = adsk.core.ObjectCollection.create()
+		for i in range(items.count):
+			collection.add(items.item(i))
+		return collection
+
+	def bodies(self,occ):
+		'''Return the bodies of an occurrence and its children in root context.'''
+		bodies = [occ.bRepBodies.item(i) for i in range(occ.bRepBodies.count)]
+		for i in range(occ.childOccurrences.count):
+			bodies += self.bodies(occ.childOccurrences.item(i))
+		return bodies
+
+	def redraw(self,circuit):
+		'''Delete the element components of a circuit and draw them again.'''
+		occs = circuit._comp.occurrences
+		for occ in [occs.item(i) for i in range(occs.count)]:
+			occ.deleteMe()
+		circuit._stale = {}
+		circuit._kept = False
+		for element in circuit.elements:
+			self.draw(circuit,element)
+		self.clean(circuit)
+
+	def cut(self,substrate,circuits,zspan,keep_tools=True):
+		'''Cut all tool bodies overlapping zspan out of a substrate at once.'''
+		start = time.perf_counter()
+		if substrate.design.incremental:
+			names = sorted(occs.item(i).component.name for circuit in circuits
+				for occs in [circuit._comp.occurrences] for i in range(occs.count))
+			cut = hashlib.sha1(repr((names,tuple(zspan))).encode()).hexdigest()
+			attributes = substrate._comp.attributes
+			last = attributes.itemByName('microfusion','cut')
+			last = None if last is None else last.value
+			if last == cut and not substrate._drawn: # Already cut by these tools
+				return {'tools': 0, 'collect': 0, 'cut': 0}
+			if substrate._kept and last != cut:
+				self.redraw(substrate)
+			attributes.add('microfusion','cut',cut)
+		z0 = min(zspan)*self.units
+		z1 = max(zspan)*self.units
+		tools = adsk.core.ObjectCollection.create()
+		for circuit in circuits:
+			for body in self.bodies(circuit._occ):
+				box = body.boundingBox
+				if box.maxPoint.z > z0 and box.minPoint.z < z1:
+					tools.add(body)
+		collected = time.perf_counter()
+		combines = self._root_comp.features.combineFeatures
+		if tools.count:
+			for target in self.bodies(substrate._occ):
+				inp = combines.createInput(target,tools)
+				inp.operation = adsk.fusion.FeatureOperations.CutFeatureOperation
+				inp.isKeepToolBodies = keep_tools
+				combines.add(inp)
+		return {'tools': tools.count, 'collect': collected-start,
+			'cut': time.perf_counter()-collected}
+
+	def finish(self,design):
+		'''Delete elements and circuits of the last run which were not redrawn.'''
+		if not design.incremental:
+			return
+		for circuit in design.circuits:
+			for occs in circuit._stale.values():
+				for occ in occs:
+					occ.deleteMe()
+			circuit._stale = {}
+		names = [circuit.name for circuit in design.circuits]
+		occs = self._root_comp.occurrences
+		stale = []
+		for i in range(occs.count):
+			comp = occs.item(i).component
+			if (comp.attributes.itemByName('microfusion','circuit')
+				and comp.name not in names):
+				stale.append(occs.item(i))
+		for occ in stale:
+			occ.deleteMe()
+
+	## Sketch curves
+	def curve(self,circuit,curve,sketch=None):
+		'''Draw a line or arc in the circuit sketch, or in another sketch.'''
+		if sketch is None:
+			sketch = circuit._sketch
+			point = lambda p: p.acadPoint3D
+		else: # Convert from model to sketch coordinates
+			point = lambda p: sketch.modelToSketchSpace(p.acadPoint3D)
+		curves = sketch.sketchCurves
+		if isinstance(curve,Arc):
+			return curves.sketchArcs.addByThreePoints(point(curve.p1),
+				point(curve.pm),point(curve.p2))
+		return curves.sketchLines.addByTwoPoints(
+			point(curve.p1),point(curve.p2))
+
+	def path(self,circuit,curves):
+		'''Draw a list of connected curves and return them as a path.'''
+		collection = adsk.core.ObjectCollection.create()
+		for curve in curves:
+			collection.add(self.curve(circuit,curve))
+		return circuit._comp.features.createPath(collection)
+
+	def origin_plane(self,circuit,normal):
+		'''Return a plane through the origin normal to a vector, and whether it is new.'''
+		comp = circuit._comp
+		axes = {(1,0,0): 'yZConstructionPlane', (0,1,0): 'xZConstructionPlane',
+			(0,0,1): 'xYConstructionPlane'}
+		if normal in axes:
+			return getattr(comp,axes[normal]), False
+		inp = comp.constructionPlanes.createInput()
+		inp.setByPlane(adsk.core.Plane.create(Pt(0,0,0).acadPoint3D,
+			adsk.core.Vector3D.create(*normal)))
+		return comp.constructionPlanes.add(inp), True
+
+	def plane_sketch(self,circuit,origin,normal):
+		'''Return a new sketch and its plane through origin normal to a vector.'''
+		# Direct designs only support construction planes set by a Plane
+		planes = circuit._comp.constructionPlanes
+		inp = planes.createInput()
+		inp.setByPlane(adsk.core.Plane.create(origin.acadPoint3D,
+			adsk.core.Vector3D.create(normal.x,normal.y,normal.z)))
+		plane = planes.add(inp)
+		sketch = circuit._comp.sketches.add(plane)
+		sketch.isLightBulbOn = False # Reduce visual clutter
+		return sketch, plane
+
+	def profile(self,circuit,sketch,curves):
+		'''Draw a closed loop of curves in a planar sketch and return its profile.'''
+		for curve in curves:
+			self.curve(circuit,curve,sketch)
+		return sketch.profiles.item(0)
+
+	## Primitives
+	def loft(self,circuit,prim):
+		'''Loft two sections along a centerline.'''
+		skel_path = self.path(circuit,[prim.curve])
+		loft_inp = circuit._comp.features.loftFeatures.createInput(
+			adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
+		for profile in prim.profiles():
+			loft_inp.loftSections.add(self.path(circuit,profile))
+		loft_inp.centerLineOrRails.addCenterLine(skel_path)
+		loft_inp.isSolid = True
+		circuit._comp.features.loftFeatures.add(loft_inp)
+
+	def sweep(self,circuit,prim):
+		'''Extrude a constant section along a line, or loft it along an arc.'''
+		curve = prim.curve
+		if isinstance(curve,Line):
+			self.extrude(circuit,prim.s1.profile(curve.p1,prim.n1),
+				curve.p1,curve.p2)
+		else:
+			self.loft(circuit,prim)
+
+	def start_profile(self,circuit,curve,sec,n):
+		'''Draw a section in its own sketch normal to the start of a curve.'''
+		if isinstance(curve,Line):
+			normal = unit(curve.p2-curve.p1)
+		else: # Arcs start tangent to the section normal
+			u = unit(n)
+			normal = Pt(u.x,u.y,0)
+		sketch, plane = self.plane_sketch(circuit,curve.p1,normal)
+		profile = self.profile(circuit,sketch,sec.profile(curve.p1,n))
+		return sketch, plane, profile
+
+	def sweep_path(self,circuit,curves,sec,n):
+		'''Sweep a section (normal to n at the start) along connected curves.'''
+		sketch, plane, profile = self.start_profile(circuit,curves[0],sec,n)
+		features = circuit._comp.features
+		sweep_inp = features.sweepFeatures.createInput(profile,
+			self.path(circuit,curves),
+			adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
+		sweep_inp.orientation = (
+			adsk.fusion.SweepOrientationTypes.PerpendicularOrientationType)
+		features.sweepFeatures.add(sweep_inp)
+		sketch.deleteMe()
+		plane.deleteMe()
+
+	def trace(self,circuit,prim):
+		'''Draw a whole trace as one sweep, or one loft if it tapers or slopes.'''
+		stations = prim.stations()
+		if all(loft.kind == 'sweep' for loft in prim.lofts):
+			return self.sweep_path(circuit,prim.curves(),
+				stations[0][1],stations[0][2])
+		skel_path = self.path(circuit,prim.curves())
+		loft_inp = circuit._comp.features.loftFeatures.createInput(
+			adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
+		for pt,sec,n in stations:
+			loft_inp.loftSections.add(self.path(circuit,sec.profile(pt,n)))
+		loft_inp.centerLineOrRails.addCenterLine(skel_path)
+		loft_inp.isSolid = True
+		circuit._comp.features.loftFeatures.add(loft_inp)
+
+	def cylinder(self,circuit,prim):
+		'''Queue a vertical cylinder to be extruded from a circle.'''
+		pt = prim.pt
+		z0, z1 = prim.zspan
+		self.extrude(circuit,circle(Pt(pt.x,pt.y,z0),prim.R),
+			Pt(pt.x,pt.y,z0),Pt(pt.x,pt.y,z1))
+
+	def extrude(self,circuit,curves,p1,p2):
+		'''Queue a closed loop through p1 normal to p2-p1 to be extruded to p2.'''
+		normal = rounded(unit(p2-p1))
+		if normal < (0,0,0): # One direction for both ways along it
+			normal = tuple(-c for c in normal)
+		n = unit(Pt(*normal))
+		key = (normal,)+tuple(sorted((dot(p1,n),dot(p2,n))))
+		batch = self._batches.setdefault(circuit,{})
+		if not circuit.design.batching:
+			key += (len(batch),) # One feature per loop
+		d = n*-dot(p1,n)
+		batch.setdefault(key,[]).append([curve.translate(d) for curve in curves])
+
+	def extrude_sheet(self,circuit,plane,normal,sheet):
+		'''Draw the loops of a sheet in one sketch and extrude them.'''
+		sketch = circuit._comp.sketches.add(plane)
+		sketch.isLightBulbOn = False # Reduce visual clutter
+		sketch.isComputeDeferred = True # Profiles are found once at the end
+		for curves,box,key in sheet.loops:
+			for curve in curves:
+				self.curve(circuit,curve,sketch)
+		sketch.isComputeDeferred = False
+		u, v = _axes(normal)
+		groups = {} # Profiles of each extent
+		for i in range(sketch.profiles.count):
+			profile = sketch.profiles.item(i)
+			box = profile.boundingBox
+			c = sketch.sketchToModelSpace(adsk.core.Point3D.create(
+				(box.minPoint.x+box.maxPoint.x)/2,
+				(box.minPoint.y+box.maxPoint.y)/2,
+				(box.minPoint.z+box.maxPoint.z)/2))
+			c = Pt(c.x,c.y,c.z)/self.units
+			k = sheet.find(dot(c,u),dot(c,v))
+			if k is not None: # Else a gap between loops
+				key = sheet.loops[k][2]
+				if key not in groups:
+					groups[key] = adsk.core.ObjectCollection.create()
+				groups[key].add(profile)
+		# Offsets are along the sketch normal, which may be opposite
+		g = plane.geometry.normal
+		flip = g.x*normal[0]+g.y*normal[1]+g.z*normal[2] < 0
+		extrudes = circuit._comp.features.extrudeFeatures
+		value = adsk.core.ValueInput.createByReal
+		for key,profiles in groups.items():
+			s0, s1 = key[1:3]
+			inp = extrudes.createInput(profiles,
+				adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
+			inp.startExtent = adsk.fusion.OffsetStartDefinition.create(
+				value((-s1 if flip else s0)*self.units))
+			inp.setDistanceExtent(False,value((s1-s0)*self.units))
+			extrudes.add(inp)
+		sketch.deleteMe()
+
+	def revolve(self,circuit,prim):
+		'''Revolve a closed polygon a full turn around an axis.'''
+		pts = prim.pts
+		path = self.path(circuit,
+			[Line(pts[i-1],pts[i]) for i in range(len(pts))])
+		axis = self.curve(circuit,prim.axis)
+		rev_inp = circuit._comp.features.revolveFeatures.createInput(
+			path, axis,
+			adsk.fusion.FeatureOperations.NewComponentFeatureOperation)
+		rev_inp.setAngleExtent(False,
+			adsk.core.ValueInput.createByReal(2*math.pi))
+		circuit._comp.features.revolveFeatures.add(rev_inp)
+
+	def outline(self,circuit,prim):
+		'''Draw the curves of a preview outline in the circuit sketch.'''
+		for curve in prim.curves:
+			self.curve(circuit,curve)
+
+	def text(self,circuit,prim):
+		'''Draw text and extrude it over its zspan.'''
+		pt = prim.pt
+		z0, z1 = min(prim.zspan), max(prim.zspan)
+		endpt = pt + (1e5,1) # Global word wrap at 10cm long
+		if z0 <= 0 <= z1:
+			sketch, plane = circuit._sketch, None
+			point = lambda p: p.acadPoint3D
+			zspan = (z0,z1)
+		else: # Mirrored or moved off the sketch plane
+			sketch, plane = self.plane_sketch(circuit,Pt(0,0,z0),Pt(0,0,1))
+			point = lambda p: sketch.modelToSketchSpace(Pt(p.x,p.y,z0).acadPoint3D)
+			zspan = (0,z1-z0)
+		texts = sketch.sketchTexts
+		inp = texts.createInput2(prim.text,prim.size*self.units) # Size in cm from size in um
+		inp.setAsMultiLine(point(pt),point(endpt),
+			adsk.core.HorizontalAlignments.LeftHorizontalAlignment,
+			adsk.core.VerticalAlignments.TopVerticalAlignment, 0)
+		inp.fontName = 'Lucida Console'
+		if prim.angle or prim.mirrored: # Copied with a rotation or mirror
+			inp.angle = math.radians(prim.angle)
+			inp.isVerticalFlip = prim.mirrored
+		inp.textStyle = 5 #BoldUnderline (TBD: Doesnt work)
+		sketch_text = texts.add(inp)
+		if zspan[1] != 0:
+			distup = adsk.core.ValueInput.createByReal(zspan[1]*self.units)
+			circuit._comp.features.extrudeFeatures.addSimple(sketch_text, distup, adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
+		if zspan[0] != 0:
+			distdown = adsk.core.ValueInput.createByReal(zspan[0]*self.units)
+			circuit._comp.features.extrudeFeatures.addSimple(sketch_text, distdown, adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
+		if plane is not None:
+			sketch.deleteMe()
+			plane.deleteMe()
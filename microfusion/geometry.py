@@ -0,0 +1,437 @@
+'''
+Backend-neutral geometry.
+
+Elements describe themselves as a list of primitives (lofts, cylinders,
+revolves and text) built from plain curves (lines and arcs). Nothing here
+depends on Fusion, so designs can be computed and checked headless. A backend
+then turns the primitives into real geometry.
+'''
+
+import math
+
+from .point import *
+
+
+## Curves
+class Line:
+	def __init__(self,p1,p2):
+		'''Straight line from p1 to p2.'''
+		self.p1 = p1
+		self.p2 = p2
+
+	@property
+	def length(self):
+		return (self.p2-self.p1).m
+
+	def translate(self,d):
+		return Line(self.p1+d,self.p2+d)
+
+	def transform(self,t):
+		return Line(t.point(self.p1),t.point(self.p2))
+
+	def key(self):
+		return ('line',rounded(self.p1),rounded(self.p2))
+
+class Arc:
+	def __init__(self,p1,pm,p2,center,R):
+		'''Circular arc from p1 through pm to p2.'''
+		self.p1 = p1
+		self.pm = pm # Midpoint of the arc, used to draw by three points
+		self.p2 = p2
+		self.center = center
+		self.R = R
+
+	@property
+	def angle(self):
+		'''Swept angle of the arc in radians.'''
+		d1 = self.p1-self.center
+		d2 = self.p2-self.center
+		c = (d1.x*d2.x + d1.y*d2.y + d1.z*d2.z)/(d1.m*d2.m)
+		return math.acos(max(-1,min(1,c)))
+
+	@property
+	def length(self):
+		return self.R*self.angle
+
+	def translate(self,d):
+		return Arc(self.p1+d,self.pm+d,self.p2+d,self.center+d,self.R)
+
+	def transform(self,t):
+		return Arc(t.point(self.p1),t.point(self.pm),t.point(self.p2),
+			t.point(self.center),self.R)
+
+	def key(self):
+		return ('arc',rounded(self.p1),rounded(self.pm),rounded(self.p2))
+
+def rounded(p,digits=6):
+	'''Return the coordinates of p rounded for use in hashable keys.'''
+	return (round(p.x,digits),round(p.y,digits),round(p.z,digits))
+
+def unit(p):
+	'''Return p scaled to unit length.'''
+	return p/p.m
+
+def level(curve,eps=1e-3):
+	'''Whether a line or arc lies in a horizontal plane.'''
+	zs = [curve.p1.z,curve.p2.z]+([curve.pm.z] if isinstance(curve,Arc) else [])
+	return max(zs)-min(zs) <= eps
+
+def dot(a,b):
+	'''Dot product of two points.'''
+	return a.x*b.x + a.y*b.y + a.z*b.z
+
+def fillet(p0,p1,p2,R):
+	'''Return the tangent points and arc filleting the corner p1 of p0-p1-p2.'''
+	u1 = unit(p1-p0)
+	u2 = unit(p2-p1)
+	c = dot(u1,u2)
+	if math.isclose(abs(c),1):
+		return None
+	half = math.acos(max(-1,min(1,c)))/2 # Half of the turn angle
+	t = R*math.tan(half) # Distance from corner to tangent points
+	t1 = p1-u1*t
+	t2 = p1+u2*t
+	b = unit(u2-u1) # Bisector pointing towards the center
+	center = p1+b*(R/math.cos(half))
+	return t1, t2, Arc(t1,center-b*R,t2,center,R)
+
+def fillet_loop(pts,Rs):
+	'''Return the curves of a closed polygon with corner i filleted by Rs[i].'''
+	n = len(pts)
+	corners = [] # Tangent points and arc of each corner
+	for i in range(n):
+		f = fillet(pts[i-1],pts[i],pts[(i+1)%n],Rs[i]) if Rs[i] else None
+		corners.append((pts[i],pts[i],None) if f is None else f)
+	curves = []
+	for i in range(n):
+		curves.append(Line(corners[i-1][1],corners[i][0]))
+		if corners[i][2] is not None:
+			curves.append(corners[i][2])
+	return curves
+
+def segments(R,angle,tol):
+	'''Return the number of chords approximating an arc within tol.'''
+	if R <= tol:
+		return max(1,math.ceil(angle/(math.pi/2)))
+	step = 2*math.acos(1-tol/R) # Angle of a chord with sagitta tol
+	return max(1,math.ceil(angle/step-1e-9))
+
+def fab_tol(params,default):
+	'''Return half the fabrication resolution, or default if it is not set.'''
+	res = params.get('fab_res')
+	return default if res is None else res/2
+
+def circle(pt,R):
+	'''Return a circle of radius R around pt in XY as two arcs.'''
+	return [Arc(pt+(R,0),pt+(0,R),pt-(R,0),pt,R),
+		Arc(pt-(R,0),pt-(0,R),pt+(R,0),pt,R)]
+
+
+## Transforms
+class Transform:
+	_normals = {'yz': 0, 'xz': 1, 'xy': 2} # Coordinate normal to each plane
+
+	def __init__(self,offset=(0,0,0),rotation=0,center=(0,0,0),mirror=None):
+		'''Mirror across a (plane, distance), rotate around center, then offset.'''
+		self.offset = Pt(*offset) if isinstance(offset,tuple) else offset
+		self.rotation = rotation
+		self.center = Pt(*center) if isinstance(center,tuple) else center
+		self.mirror = mirror
+
+	@property
+	def flips_z(self):
+		'''Whether the transform turns the design upside down.'''
+		return self.mirror is not None and self.mirror[0] == 'xy'
+
+	def point(self,p):
+		'''Return the transformed point.'''
+		if self.mirror is not None:
+			plane, distance = self.mirror
+			c = [p.x,p.y,p.z]
+			i = self._normals[plane]
+			c[i] = 2*distance-c[i]
+			p = Pt(*c)
+		if self.rotation:
+			p = p.rotate(self.rotation,self.center)
+		return p+self.offset
+
+	def vector(self,n):
+		'''Return the transformed direction, which is not moved.'''
+		return self.point(n)-self.point(Pt(0,0,0))
+
+
+## Primitives
+class Loft:
+	kind = 'loft'
+	def __init__(self,curve,s1,s2,n1,n2):
+		'''Loft section s1 (normal n1) to s2 (normal n2) along a curve.'''
+		self.curve = curve
+		self.s1 = s1
+		self.s2 = s2
+		self.n1 = n1
+		self.n2 = n2
+
+	def profiles(self):
+		'''Return the placed start and end profiles.'''
+		return (self.s1.profile(self.curve.p1,self.n1),
+			self.s2.profile(self.curve.p2,self.n2))
+
+	def translate(self,d):
+		return Loft(self.curve.translate(d),self.s1,self.s2,self.n1,self.n2)
+
+	def transform(self,t):
+		# Sections are symmetric across their width, so only flips in Z change them
+		s1, s2 = (self.s1.invert(),self.s2.invert()) if t.flips_z else (self.s1,self.s2)
+		return Loft(self.curve.transform(t),s1,s2,t.vector(self.n1),
+			t.vector(self.n2))
+
+	def key(self):
+		return (self.kind,self.curve.key(),self.s1.key(),self.s2.key(),
+			rounded(self.n1),rounded(self.n2))
+
+	def outline(self):
+		return Outline([self.curve])
+
+	def draft(self):
+		return Loft(self.curve,self.s1.draft(),self.s2.draft(),self.n1,self.n2)
+
+class Sweep(Loft):
+	kind = 'sweep'
+	def __init__(self,curve,s,n1,n2):
+		'''Sweep a constant section s along a curve, normal to n1 then n2.'''
+		super().__init__(curve,s,s,n1,n2)
+
+	def translate(self,d):
+		return Sweep(self.curve.translate(d),self.s1,self.n1,self.n2)
+
+	def transform(self,t):
+		s = self.s1.invert() if t.flips_z else self.s1
+		return Sweep(self.curve.transform(t),s,t.vector(self.n1),
+			t.vector(self.n2))
+
+	def draft(self):
+		return Sweep(self.curve,self.s1.draft(),self.n1,self.n2)
+
+class TraceBody:
+	kind = 'trace'
+	def __init__(self,lofts):
+		'''A whole trace drawn as one body from its consecutive lofts.'''
+		self.lofts = lofts
+
+	def curves(self):
+		'''Return the connected lines and arcs of the centerline.'''
+		return [loft.curve for loft in self.lofts]
+
+	def stations(self,eps=1e-3):
+		'''Return (point, section, normal) at the ends and around each taper.'''
+		first, last = self.lofts[0], self.lofts[-1]
+		stations = [(first.curve.p1,first.s1,first.n1)]
+		def add(station):
+			if (station[0]-stations[-1][0]).m > eps:
+				stations.append(station)
+		for loft in self.lofts:
+			if loft.kind == 'loft': # Sections only change along tapers
+				add((loft.curve.p1,loft.s1,loft.n1))
+				add((loft.curve.p2,loft.s2,loft.n2))
+		add((last.curve.p2,last.s2,last.n2))
+		return stations
+
+	def translate(self,d):
+		return TraceBody([loft.translate(d) for loft in self.lofts])
+
+	def transform(self,t):
+		return TraceBody([loft.transform(t) for loft in self.lofts])
+
+	def key(self):
+		return (self.kind,)+tuple(loft.key() for loft in self.lofts)
+
+	def outline(self):
+		return Outline(self.curves())
+
+	def draft(self):
+		return TraceBody([loft.draft() for loft in self.lofts])
+
+class Cylinder:
+	kind = 'cylinder'
+	def __init__(self,pt,R,zspan):
+		'''Vertical cylinder of radius R at pt from zspan[0] to zspan[1].'''
+		self.pt = pt
+		self.R = R
+		self.zspan = zspan
+
+	def translate(self,d):
+		return Cylinder(self.pt+d,self.R,[z+d.z for z in self.zspan])
+
+	def transform(self,t):
+		return Cylinder(t.point(self.pt),self.R,
+			[t.point(Pt(self.pt.x,self.pt.y,z)).z for z in self.zspan])
+
+	def key(self):
+		return (self.kind,rounded(self.pt),self.R,tuple(self.zspan))
+
+	def outline(self):
+		return Outline(circle(self.pt,self.R))
+
+	def draft(self):
+		return self
+
+class Revolve:
+	kind = 'revolve'
+	def __init__(self,pts,axis):
+		'''Revolve the closed polygon pts a full turn around the axis line.'''
+		self.pts = pts
+		self.axis = axis
+
+	def translate(self,d):
+		return Revolve([pt+d for pt in self.pts],self.axis.translate(d))
+
+	def transform(self,t):
+		return Revolve([t.point(pt) for pt in self.pts],self.axis.transform(t))
+
+	def key(self):
+		return (self.kind,tuple(rounded(pt) for pt in self.pts),
+			self.axis.key())
+
+	def outline(self):
+		# Footprint of a vertical axis, the circle of the outermost point
+		c = self.axis.p1
+		R = max(((pt.x-c.x)**2+(pt.y-c.y)**2)**.5 for pt in self.pts)
+		return Outline(circle(Pt(c.x,c.y,0),R))
+
+	def draft(self):
+		return self
+
+class TextBox:
+	kind = 'text'
+	def __init__(self,pt,text,size,zspan,u=Pt(1,0,0),v=Pt(0,-1,0)):
+		'''Text at pt extruded over zspan, reading along u with lines along v.'''
+		self.pt = pt
+		self.text = text
+		self.size = size
+		self.zspan = zspan
+		self.u = u
+		self.v = v
+
+	@property
+	def angle(self):
+		'''Direction of reading in degrees from the x axis.'''
+		return math.degrees(math.atan2(self.u.y,self.u.x))
+
+	@property
+	def mirrored(self):
+		'''Whether the glyphs are flipped across the reading direction.'''
+		return self.u.x*self.v.y-self.u.y*self.v.x > 0
+
+	def translate(self,d):
+		return TextBox(self.pt+d,self.text,self.size,self.zspan,self.u,self.v)
+
+	def transform(self,t):
+		# The glyph box turns and mirrors with the body, as in Fusion
+		return TextBox(t.point(self.pt),self.text,self.size,
+			[t.point(Pt(self.pt.x,self.pt.y,z)).z for z in self.zspan],
+			t.vector(self.u),t.vector(self.v))
+
+	def key(self):
+		return (self.kind,rounded(self.pt),self.text,self.size,
+			tuple(self.zspan),rounded(self.u),rounded(self.v))
+
+	def outline(self):
+		return TextBox(self.pt,self.text,self.size,[0,0],self.u,self.v) # Not extruded
+
+	def draft(self):
+		return self
+
+class Outline:
+	kind = 'outline'
+	def __init__(self,curves):
+		'''Sketch curves drawn in place of a solid in preview mode.'''
+		self.curves = curves
+
+	def translate(self,d):
+		return Outline([curve.translate(d) for curve in self.curves])
+
+	def transform(self,t):
+		return Outline([curve.transform(t) for curve in self.curves])
+
+	def key(self):
+		return (self.kind,)+tuple(curve.key() for curve in self.curves)
+
+	def outline(self):
+		return self
+
+	def draft(self):
+		return self
+
+def detail(prims,mode):
+	'''Return primitives at the level of detail of a design mode.'''
+	if mode == 'preview':
+		return [prim.outline() for prim in prims]
+	if mode == 'draft':
+		return [prim.draft() for prim in prims]
+	return prims
+
+
+## Element geometry
+def simplify_path(pts,secs,Rs,eps=1e-3):
+	'''Return the minimal pts, secs and Rs describing the same trace.'''
+	keep = [0]
+	for i in range(1,len(pts)):
+		if (pts[i]-pts[keep[-1]]).m > eps:
+			keep.append(i)
+		elif i == len(pts)-1 and len(keep) > 1: # Keep the end point itself
+			keep[-1] = i
+	out = [keep[0]]
+	for j in range(1,len(keep)-1):
+		a, i, b = out[-1], keep[j], keep[j+1]
+		straight = math.isclose(dot(unit(pts[i]-pts[a]),unit(pts[b]-pts[i])),1)
+		if not (straight and secs[a] == secs[i] == secs[b]):
+			out.append(i)
+	if len(keep) > 1:
+		out.append(keep[-1])
+	return ([pts[i] for i in out],[secs[i] for i in out],
+		[Rs[i] for i in out])
+
+def trace_lofts(pts,secs,Rs,eps=1e-3):
+	'''Return the lofts and sweeps of a trace through pts with filleted corners.'''
+	# Tangent points of each corner (the ends are never filleted)
+	starts = list(pts[:-1]) # Start of each straight segment
+	ends = list(pts[1:]) # End of each straight segment
+	arcs = [None for i in range(len(pts))]
+	for i in range(1,len(pts)-1):
+		f = fillet(pts[i-1],pts[i],pts[i+1],Rs[i])
+		if f is not None:
+			ends[i-1],starts[i],arcs[i] = f
+	# Loft segments and arcs in path order
+	lofts = []
+	for i in range(1,len(pts)):
+		n = pts[i]-pts[i-1]
+		line = Line(starts[i-1],ends[i-1])
+		if line.length > eps: # Skip segments consumed by the fillets
+			if secs[i-1] == secs[i] and level(line,eps):
+				lofts.append(Sweep(line,secs[i],n,n))
+			else:
+				lofts.append(Loft(line,secs[i-1],secs[i],n,n))
+		if i < len(pts)-1 and arcs[i] is not None:
+			n2 = pts[i+1]-pts[i]
+			if level(arcs[i],eps):
+				lofts.append(Sweep(arcs[i],secs[i],n,n2))
+			else:
+				lofts.append(Loft(arcs[i],secs[i],secs[i],n,n2))
+	return lofts
+
+def port_profile(pt,H,flip=False):
+	'''Return the barb profile and revolve axis of a port at pt.'''
+	R0 = 900 # Tapered outer radius of barb
+	R1 = 1100 # Flared outer radius of barb
+	R2 = 2250 # Space for outer radius of tubing
+	taper = 1000 # How long is the taper
+
+	# Create pointlist for the sketch (0,0 is top along centerline)
+	pr = [R0, R1, R0, R0, (R0+R2)/2, R2, R2]
+	pz = [0, -taper, -taper, -taper*2, -taper*2-(R2-R0)/2,-taper*2,0]
+	if flip:
+		pz = [-z for z in pz]
+		H = -H
+	pts = [pt+Pt(pr[i],0,H+pz[i]) for i in range(len(pr))]
+	axis = Line(pt,pt+Pt(0,0,H)) # Axis to revolve around
+	return pts, axis
@@ -0,0 +1,292 @@
+'''
+Mesh export.
+
+Tessellates the primitives planned by elements into triangles and streams them
+to binary STL or 3MF files one element at a time, so memory use does not grow
+with the size of the chip. Arcs (fillets, vias, barbs and curved sections) are
+split into chords deviating at most tol from the true curve.
+
+Every primitive is written as its own closed shell. Text is not exported, and
+substrates are not cut: write the substrates and the channels to separate
+files and subtract them in the slicer or mesh tool.
+'''
+
+import os
+import math
+import struct
+import zipfile
+
+from .point import *
+from .geometry import *
+
+
+## Vectors as (x, y, z) tuples
+def _sub(a,b):
+	return (a[0]-b[0],a[1]-b[1],a[2]-b[2])
+
+def _cross(a,b):
+	return (a[1]*b[2]-a[2]*b[1],a[2]*b[0]-a[0]*b[2],a[0]*b[1]-a[1]*b[0])
+
+def _dot(a,b):
+	return a[0]*b[0]+a[1]*b[1]+a[2]*b[2]
+
+def _tuple(p):
+	return (p.x,p.y,p.z)
+
+def arc_points(arc,tol):
+	'''Return points along an arc, including both ends, and their tangents.'''
+	c = arc.center
+	e1 = unit(arc.p1-c)
+	angle = arc.angle
+	half = unit(arc.pm-c) # Direction halfway along the arc
+	e2 = unit(half-e1*math.cos(angle/2))
+	n = segments(arc.R,angle,tol)
+	pts = []
+	tangents = []
+	for i in range(n+1):
+		a = angle*i/n
+		cos, sin = math.cos(a), math.sin(a)
+		pts.append(c+(e1*cos+e2*sin)*arc.R)
+		tangents.append(e2*cos-e1*sin)
+	return pts, tangents
+
+def ring(curves,tol):
+	'''Return the points of a closed loop of curves.'''
+	pts = []
+	for curve in curves:
+		if isinstance(curve,Arc):
+			pts += [_tuple(p) for p in arc_points(curve,tol)[0][:-1]]
+		else:
+			pts.append(_tuple(curve.p1))
+	return pts
+
+def orient(pts,d):
+	'''Return a ring ordered counterclockwise around the direction d.'''
+	n = (0,0,0) # Normal of the ring by Newell's method
+	for i in range(len(pts)):
+		a, b = pts[i-1], pts[i]
+		n = (n[0]+(a[1]-b[1])*(a[2]+b[2]),n[1]+(a[2]-b[2])*(a[0]+b[0]),
+			n[2]+(a[0]-b[0])*(a[1]+b[1]))
+	return pts if _dot(n,d) >= 0 else pts[::-1]
+
+def resample(pts,n):
+	'''Return n points evenly spaced along the perimeter of a ring.'''
+	closed = pts+[pts[0]]
+	lengths = [math.dist(closed[i],closed[i+1]) for i in range(len(pts))]
+	total = sum(lengths)
+	out = []
+	i = 0
+	s = 0 # Perimeter length at the start of edge i
+	for k in range(n):
+		target = total*k/n
+		while s+lengths[i] < target and i < len(lengths)-1:
+			s += lengths[i]
+			i += 1
+		t = (target-s)/lengths[i] if lengths[i] else 0
+		a, b = closed[i], closed[i+1]
+		out.append((a[0]+(b[0]-a[0])*t,a[1]+(b[1]-a[1])*t,a[2]+(b[2]-a[2])*t))
+	return out
+
+def tube(rings,caps=True):
+	'''Yield the triangles joining counterclockwise rings along their axis.'''
+	for r0,r1 in zip(rings,rings[1:]):
+		for j in range(len(r0)):
+			a, b, c, d = r0[j-1], r0[j], r1[j], r1[j-1]
+			yield (a,b,c)
+			yield (a,c,d)
+	if caps:
+		first, last = rings[0], rings[-1]
+		for j in range(1,len(first)-1):
+			yield (first[0],first[j+1],first[j])
+		for j in range(1,len(last)-1):
+			yield (last[0],last[j],last[j+1])
+
+def loft_triangles(prim,tol):
+	'''Yield the triangles of a loft or sweep along a line or arc.'''
+	curve = prim.curve
+	if isinstance(curve,Arc):
+		pts, tangents = arc_points(curve,tol)
+		n = len(pts)-1
+		secs = [prim.s1 if i < n/2 else prim.s2 for i in range(n+1)]
+		stations = list(zip(pts,secs,tangents))
+	else:
+		stations = [(curve.p1,prim.s1,prim.n1),(curve.p2,prim.s2,prim.n2)]
+	rings = [orient(ring(sec.profile(pt,n),tol),_tuple(n))
+		for pt,sec,n in stations]
+	count = max(len(r) for r in rings)
+	rings = [r if len(r) == count else orient(resample(r,count),_tuple(n))
+		for r,(pt,sec,n) in zip(rings,stations)]
+	yield from tube(rings)
+
+def cylinder_triangles(prim,tol):
+	'''Yield the triangles of a vertical cylinder.'''
+	z0, z1 = sorted(prim.zspan)
+	p, R = prim.pt, prim.R
+	n = max(3,segments(R,2*math.pi,tol))
+	circle = [(p.x+R*math.cos(2*math.pi*i/n),p.y+R*math.sin(2*math.pi*i/n))
+		for i in range(n)]
+	yield from tube([[(x,y,z0) for x,y in circle],[(x,y,z1) for x,y in circle]])
+
+def revolve_triangles(prim,tol):
+	'''Yield the triangles of a polygon revolved a full turn around its axis.'''
+	o = _tuple(prim.axis.p1)
+	a = _tuple(unit(prim.axis.p2-prim.axis.p1))
+	pts = [_tuple(p) for p in prim.pts]
+	# Radial and axial coordinates of the polygon
+	rh = []
+	for q in pts:
+		v = _sub(q,o)
+		h = _dot(v,a)
+		rh.append((math.dist(v,(a[0]*h,a[1]*h,a[2]*h)),h))
+	area = sum(rh[i-1][0]*rh[i][1]-rh[i][0]*rh[i-1][1] for i in range(len(rh)))
+	R = max(r for r,h in rh)
+	n = max(3,segments(R,2*math.pi,tol))
+	v = _sub(pts[0],o) # Any direction normal to the axis will do
+	h = _dot(v,a)
+	e1 = _sub(v,(a[0]*h,a[1]*h,a[2]*h))
+	m = math.sqrt(_dot(e1,e1))
+	e1 = (e1[0]/m,e1[1]/m,e1[2]/m)
+	e2 = _cross(a,e1)
+	def place(r,h,k):
+		c, s = math.cos(2*math.pi*k/n), math.sin(2*math.pi*k/n)
+		return tuple(o[i]+a[i]*h+(e1[i]*c+e2[i]*s)*r for i in range(3))
+	loops = [[place(r,h,k) for r,h in rh] for k in range(n)]
+	for k in range(n):
+		l0, l1 = loops[k], loops[(k+1)%n]
+		for j in range(len(rh)):
+			p0, p1, q1, q0 = l0[j-1], l0[j], l1[j], l1[j-1]
+			if area > 0:
+				yield (p0,q0,q1)
+				yield (p0,q1,p1)
+			else:
+				yield (p0,q1,q0)
+				yield (p0,p1,q1)
+
+def triangles(prim,tol=1):
+	'''Yield the triangles of a primitive as triples of (x, y, z).'''
+	if prim.kind in ('loft','sweep'):
+		yield from loft_triangles(prim,tol)
+	elif prim.kind == 'trace':
+		for loft in prim.lofts:
+			yield from loft_triangles(loft,tol)
+	elif prim.kind == 'cylinder':
+		yield from cylinder_triangles(prim,tol)
+	elif prim.kind == 'revolve':
+		yield from revolve_triangles(prim,tol)
+
+
+## Sources
+def element_groups(design,substrates=True,channels=True):
+	'''Yield the primitives of each element of the chosen circuits.'''
+	subs = [cir for cir,zspan in design.substrates]
+	for cir in design.circuits:
+		if (substrates if cir in subs else channels):
+			for element in cir.elements:
+				yield element.plan()
+
+def backend_groups(backend,substrates=True,channels=True):
+	'''Yield each primitive recorded by a geometry backend as its own group.'''
+	for cir,prim in backend.prims:
+		sub = any(cir is c for c,zspan in cir.design.substrates)
+		if (substrates if sub else channels):
+			yield [prim]
+
+
+## Writers
+class STLWriter:
+	'''Streams triangles into a binary STL file through a fixed buffer.'''
+	record = struct.Struct('<12fH')
+
+	def __init__(self,path,scale=1e-3,buffer=4096):
+		self.file = open(path,'wb')
+		self.file.write(b'microfusion'.ljust(80)+struct.pack('<I',0))
+		self.scale = scale
+		self.buffer = bytearray(self.record.size*buffer)
+		self.used = 0 # Bytes of the buffer in use
+		self.count = 0 # Triangles written
+
+	def add(self,tri):
+		s = self.scale
+		a, b, c = tri
+		n = _cross(_sub(b,a),_sub(c,a))
+		m = math.sqrt(_dot(n,n)) or 1
+		self.record.pack_into(self.buffer,self.used,n[0]/m,n[1]/m,n[2]/m,
+			a[0]*s,a[1]*s,a[2]*s,b[0]*s,b[1]*s,b[2]*s,c[0]*s,c[1]*s,c[2]*s,0)
+		self.used += self.record.size
+		self.count += 1
+		if self.used == len(self.buffer):
+			self.flush()
+
+	def flush(self):
+		self.file.write(memoryview(self.buffer)[:self.used])
+		self.used = 0
+
+	def close(self):
+		'''Write the remaining triangles and the final triangle count.'''
+		self.flush()
+		self.file.seek(80)
+		self.file.write(struct.pack('<I',self.count))
+		self.file.close()
+
+def write_stl(path,groups,tol=1,scale=1e-3):
+	'''Write the groups to a binary STL file and return the triangle count.'''
+	writer = STLWriter(path,scale)
+	try:
+		for prims in groups:
+			for prim in prims:
+				for tri in triangles(prim,tol):
+					writer.add(tri)
+	finally:
+		writer.close()
+	return writer.count
+
+def write_3mf(path,groups,tol=1,scale=1e-3):
+	'''Write every group as one mesh object of a 3MF file, in mm.'''
+	count = 0
+	ids = []
+	with zipfile.ZipFile(path,'w',zipfile.ZIP_DEFLATED) as z:
+		z.writestr('[Content_Types].xml','<?xml version="1.0" encoding="UTF-8"?>'
+			'<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+			'<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+			'<Default Extension="model" ContentType="application/vnd.ms-package.3dmanufacturing-3dmodel+xml"/>'
+			'</Types>')
+		z.writestr('_rels/.rels','<?xml version="1.0" encoding="UTF-8"?>'
+			'<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+			'<Relationship Target="/3D/3dmodel.model" Id="rel0" Type="http://schemas.microsoft.com/3dmanufacturing/2013/01/3dmodel"/>'
+			'</Relationships>')
+		with z.open('3D/3dmodel.model','w') as f:
+			f.write(b'<?xml version="1.0" encoding="UTF-8"?>\n'
+				b'<model unit="millimeter" xmlns="http://schemas.microsoft.com/3dmanufacturing/core/2015/02">'
+				b'<resources>\n')
+			for prims in groups:
+				# Only the vertices and triangles of one group are held at once
+				index = {}
+				tris = []
+				for prim in prims:
+					for tri in triangles(prim,tol):
+						tris.append([index.setdefault(p,len(index)) for p in tri])
+				if not tris:
+					continue
+				ids.append(len(ids)+1)
+				lines = ['<object id="{}" type="model"><mesh><vertices>'.format(ids[-1])]
+				lines += ['<vertex x="{:.6g}" y="{:.6g}" z="{:.6g}"/>'.format(
+					p[0]*scale,p[1]*scale,p[2]*scale) for p in index]
+				lines.append('</vertices><triangles>')
+				lines += ['<triangle v1="{}" v2="{}" v3="{}"/>'.format(*t)
+					for t in tris]
+				lines.append('</triangles></mesh></object>\n')
+				f.write(''.join(lines).encode())
+				count += len(tris)
+			f.write(b'</resources><build>')
+			f.write(''.join('<item objectid="{}"/>'.format(i) for i in ids).encode())
+			f.write(b'</build></model>\n')
+	return count
+
+def export_stl(backend,path,tol=None):
+	'''Write channels.stl and substrate.stl of a geometry backend.'''
+	if tol is None:
+		tol = fab_tol(backend.prims[0][0].design.params,1) if backend.prims else 1
+	write_stl(os.path.join(path,'channels.stl'),
+		backend_groups(backend,substrates=False),tol)
+	write_stl(os.path.join(path,'substrate.stl'),
+		backend_groups(backend,channels=False),tol)
@@ -0,0 +1,180 @@
+'''
+Pin registry.
+
+Collects the pins of every element of a design and the nets connecting them.
+'''
+
+import math
+
+from .point import *
+from .geometry import *
+
+class Pin:
+	__slots__ = ('circuit','element','name','pt','net')
+
+	def __init__(self,circuit,element,name,pt):
+		'''The pin name of an element, at pt.'''
+		self.circuit = circuit
+		self.element = element
+		self.name = name
+		self.pt = pt
+		self.net = None # Index of the net in the registry
+
+	@property
+	def terminal(self):
+		'''Whether the pin should connect to another element.'''
+		return self.name in self.element.terminals
+
+	def __str__(self):
+		return '{} element {} ({}) pin {} at ({:.6g}, {:.6g}, {:.6g})'.format(
+			self.circuit.name,self.circuit.elements.index(self.element),
+			type(self.element).__name__,self.name,
+			self.pt.x,self.pt.y,self.pt.z)
+
+class PinRegistry:
+	def __init__(self,design,tol=None):
+		'''Pins and nets of the elements outside the substrates of a design.'''
+		self.design = design
+		self.tol = fab_tol(design.params,1e-3) if tol is None else tol # Snapping
+		if not self.tol > 0: # Pins are binned into cells of at least tol
+			raise ValueError('tol must be positive, not {!r}'.format(self.tol))
+		subs = [cir for cir,zspan in design.substrates]
+		self.pins = [Pin(cir,element,name,getattr(element,name))
+			for cir in design.circuits if cir not in subs
+			for element in cir.elements for name in element.pins]
+		xs = [pin.pt.x for pin in self.pins]
+		ys = [pin.pt.y for pin in self.pins]
+		zs = [pin.pt.z for pin in self.pins]
+
+		# Bin the pins into cells holding a few pins each, and no smaller
+		# than tol, so the pins within tol are always in the 3x3 neighbours
+		self.cell = self.tol
+		if len(xs) > 1:
+			w, h = max(xs)-min(xs), max(ys)-min(ys)
+			self.cell = max(self.tol,math.sqrt(w*h/len(xs)),(w+h)/len(xs))
+		self.grid = {} # Indices of the pins in each (i, j) cell
+		for k,(x,y) in enumerate(zip(xs,ys)):
+			self.grid.setdefault(self._cell(x,y),[]).append(k)
+		self._bounds = None if not xs else (self._cell(min(xs),min(ys))
+			+self._cell(max(xs),max(ys)))
+
+		# Snap pins into nets
+		parent = list(range(len(self.pins)))
+		def root(k):
+			while parent[k] != k:
+				parent[k] = parent[parent[k]]
+				k = parent[k]
+			return k
+		def join(k1,k2):
+			parent[root(k1)] = root(k2)
+		for (i,j),ks in self.grid.items():
+			near = self._near(i,j)
+			for k1 in ks:
+				x, y, z = xs[k1], ys[k1], zs[k1]
+				for k2 in near:
+					if k2 > k1 and (abs(xs[k2]-x) <= self.tol and
+						abs(ys[k2]-y) <= self.tol and abs(zs[k2]-z) <= self.tol
+						and math.sqrt((xs[k2]-x)**2+(ys[k2]-y)**2
+						+(zs[k2]-z)**2) <= self.tol):
+						join(k1,k2)
+		# Traces and vias connect their own pins and all pins on their path
+		first = {} # Index of the first pin of each element
+		for k,pin in enumerate(self.pins):
+			element = pin.element
+			if id(element) in first:
+				continue
+			first[id(element)] = k
+			wires = element.wires()
+			if not wires:
+				continue
+			for n in range(1,len(element.pins)):
+				join(k+n,k)
+			for wire in wires:
+				for p1,p2 in zip(wire[:-1],wire[1:]):
+					x0, x1 = min(p1.x,p2.x)-self.tol, max(p1.x,p2.x)+self.tol
+					y0, y1 = min(p1.y,p2.y)-self.tol, max(p1.y,p2.y)+self.tol
+					for k2 in self._along(p1,p2):
+						if (x0 <= xs[k2] <= x1 and y0 <= ys[k2] <= y1 and
+							_distance(xs[k2],ys[k2],zs[k2],p1,p2) <= self.tol):
+							join(k2,k)
+		nets = {}
+		for k,pin in enumerate(self.pins):
+			nets.setdefault(root(k),[]).append(pin)
+		self.nets = list(nets.values()) # Lists of the pins of each net
+		for n,net in enumerate(self.nets):
+			for pin in net:
+				pin.net = n
+
+	def __len__(self):
+		return len(self.pins)
+
+	def _cell(self,x,y):
+		return (math.floor(x/self.cell),math.floor(y/self.cell))
+
+	def _near(self,i,j):
+		'''Return the pins in a cell and its eight neighbours.'''
+		return [k for di in (-1,0,1) for dj in (-1,0,1)
+			for k in self.grid.get((i+di,j+dj),())]
+
+	def _along(self,p1,p2):
+		'''Return the pins in the cells near a segment.'''
+		steps = math.ceil(math.hypot(p2.x-p1.x,p2.y-p1.y)/self.cell)
+		cells = set()
+		for s in range(steps+1): # Samples less than a cell apart
+			t = s/steps if steps else 0
+			i, j = self._cell(p1.x+t*(p2.x-p1.x),p1.y+t*(p2.y-p1.y))
+			cells.update((i+di,j+dj) for di in (-1,0,1) for dj in (-1,0,1))
+		return [k for c in cells for k in self.grid.get(c,())]
+
+	def nearest_pin(self,pt,within=math.inf):
+		'''Return the Pin closest to a point, or None if none is within.'''
+		if isinstance(pt,tuple):
+			pt = Pt(*pt)
+		if self._bounds is None:
+			return None
+		i0, j0 = self._cell(pt.x,pt.y)
+		imin, jmin, imax, jmax = self._bounds
+		# Rings of cells around pt, from the first to the last in the grid
+		first = max(0,imin-i0,i0-imax,jmin-j0,j0-jmax)
+		last = max(i0-imin,imax-i0,j0-jmin,jmax-j0)
+		best, nearest = within, None
+		for r in range(first,last+1):
+			if (r-1)*self.cell > best: # Further rings are all too far
+				break
+			for i in range(max(i0-r,imin),min(i0+r,imax)+1):
+				if abs(i-i0) == r: # Whole column of the ring
+					js = range(max(j0-r,jmin),min(j0+r,jmax)+1)
+				else: # Top and bottom cell only
+					js = [j for j in (j0-r,j0+r) if jmin <= j <= jmax]
+				for j in js:
+					for k in self.grid.get((i,j),()):
+						d = (self.pins[k].pt-pt).m
+						if d <= best:
+							best, nearest = d, self.pins[k]
+		return nearest
+
+	def net_of(self,pin):
+		'''Return the pins connected to a Pin, or to the pin within tol of a point.'''
+		if not isinstance(pin,Pin):
+			pin = self.nearest_pin(pin,self.tol)
+			if pin is None:
+				return []
+		return self.nets[pin.net]
+
+	def connected(self,a,b):
+		'''Whether two Pins, or the pins at two points, share a net.'''
+		a, b = self.net_of(a), self.net_of(b)
+		return bool(a) and a is b
+
+	def dangling(self):
+		'''Return the terminal Pins not connected to any other element.'''
+		return [pin for pin in self.pins if pin.terminal and all(
+			other.element is pin.element for other in self.nets[pin.net])]
+
+def _distance(x,y,z,p1,p2):
+	'''Return the distance from the point (x, y, z) to the segment p1 p2.'''
+	ux, uy, uz = p2.x-p1.x, p2.y-p1.y, p2.z-p1.z
+	dx, dy, dz = x-p1.x, y-p1.y, z-p1.z
+	l = ux*ux+uy*uy+uz*uz
+	t = 0 if l == 0 else max(0,min(1,(dx*ux+dy*uy+dz*uz)/l))
+	return math.sqrt((dx-ux*t)**2+(dy-uy*t)**2+(dz-uz*t)**2)
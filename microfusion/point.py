@@ -1,123 +1,324 @@
-'''
-Point Class.
-
-Overloaded operations:
-+ : Add in x, y, and z
-- : Subtract in x, y, and z
-| : Take x of left point and y of right point
-^ : Take x,y of left point and z of right point
-% : Return midpoint in x and y
-* : Multiply elementwise by a scalar
-/ : Divide elementwise by a scalar
-
-All operations work on tuples as well.
-
-'''
-
-import adsk.core, adsk.fusion, traceback
-import math
-
-class Pt:
-	def __init__(self,x=0,y=0,z=0):
-		'''Point constructor'''
-
-		# Note that Fusion only works in cm
-		# If units=.1 then 1mm in fusion -> 1um
-		# If units=1e-4 then 1um in fusion -> 1um
-		self.units = 1e-4 # Number of cm in 1 unit
-		units = self.units 
-
-		# If first argument is an acadPoint3D, then convert it
-		if isinstance(x,adsk.core.Point3D):
-			z = x.z/units
-			y = x.y/units
-			x = x.x/units
-
-		self.x = x
-		self.y = y
-		self.z = z
-		self.m = (x*x + y*y + z*z)**.5 # Length to origin
-
-		self.acadPoint3D = adsk.core.Point3D.create(
-			float(x*units),float(y*units),float(z*units))
-
-	def __str__(self):
-		return str((self.x,self.y,self.z))
-
-	def rotate(self,degrees,center=(0,0,0)):
-		'''Returns a rotated point in 2D around a center.'''
-		# Rotation units are degrees!
-		d = self-center
-		rads = math.pi * degrees / 180
-		return center+Pt(
-			d.x*math.cos(rads)-d.y*math.sin(rads),
-			d.y*math.cos(rads)+d.x*math.sin(rads),
-			d.z)
-
-
-	# Overloaded operators
-	def __or__(self,other):
-		'''Take the x of the self and the y of other.'''
-		if not isinstance(other,Pt):
-			other = Pt(*other)
-		return Pt(self.x,other.y)
-
-	def __ror__(self,other):
-		'''Take the x of other and the y of self.'''
-		if not isinstance(other,Pt):
-			other = Pt(*other)
-		return Pt(other.x,self.y)
-
-	def __mod__(self,other):
-		'''Take the midpoint of the two points.'''
-		if not isinstance(other,Pt):
-			other = Pt(*other)
-		return Pt((self.x+other.x)/2,(self.y+other.y)/2)
-
-	def __rmod__(self,other):
-		'''Called when python tries to evaluate other % self.'''
-		return self % other
-
-	def __xor__(self,other):
-		'''Take the x,y of self and the z of other.'''
-		if not isinstance(other,Pt):
-			other = Pt(*other)
-		return Pt(self.x,self.y,other.z)
-
-	def __rxor__(self,other):
-		'''Called when python tries to evaluate other ^ self.'''
-		if not isinstance(other,Pt):
-			other = Pt(*other)
-		return Pt(other.x,other.y,self.z)
-
-	def __add__(self,other):
-		'''Sum the x and y.'''
-		if not isinstance(other,Pt):
-			other = Pt(*other)
-		return Pt(self.x+other.x,self.y+other.y,self.z+other.z)
-
-	def __radd__(self,other):
-		'''Called when python tries to evaluate other + self.'''
-		return self + other
-
-	def __sub__(self,other):
-		'''Difference the x and y.'''
-		if not isinstance(other,Pt):
-			other = Pt(*other)
-		return Pt(self.x-other.x,self.y-other.y,self.z-other.z)
-	def __rsub__(self,other):
-		'''Called when python tries to evaluate other - self.'''
-		if not isinstance(other,Pt):
-			other = Pt(*other)
-		return Pt(other.x-self.x,other.y-self.y,other.z-self.z)
-
-	def __mul__(self,scalar):
-		'''Multiply with scalar.'''
-		return Pt(self.x*scalar,self.y*scalar,self.z*scalar)
-	def __rmul__(self,other):
-		'''Called when python tries to evaluate other * self.'''
-		return self * other
-
-	def __truediv__(self,scalar):
-		'''Divide by scalar.'''
-		return self * (1/scalar)
\ No newline at end of file
+'''
+Point Class.
+
+Overloaded operations:
++ : Add in x, y, and z
+- : Subtract in x, y, and z
+| : Take x of left point and y of right point
+^ : Take x,y of left point and z of right point
+% : Return midpoint in x and y
+* : Multiply elementwise by a scalar
+/ : Divide elementwise by a scalar
+
+All operations work on tuples as well.
+
+PointArray supports the same operations on many points at once, between an
+array and a Point, tuple or another array of the same length.
+
+'''
+
+try:
+	import adsk.core, adsk.fusion
+except ImportError: # Running headless outside of Fusion
+	adsk = None
+try:
+	import numpy as np
+except ImportError: # Fall back to plain lists without NumPy
+	np = None
+import math
+import operator
+
+class Pt:
+	# Points are created in large numbers by every operation, so they only
+	# store their coordinates. The length and the Fusion point are computed
+	# on first use and cached.
+	__slots__ = ('x','y','z','_m','_acadPoint3D')
+
+	# Note that Fusion only works in cm
+	# If units=.1 then 1mm in fusion -> 1um
+	# If units=1e-4 then 1um in fusion -> 1um
+	units = 1e-4 # Number of cm in 1 unit
+
+	def __init__(self,x=0,y=0,z=0):
+		'''Point constructor'''
+		# If first argument is an acadPoint3D, then convert it
+		if adsk is not None and isinstance(x,adsk.core.Point3D):
+			units = self.units
+			z = x.z/units
+			y = x.y/units
+			x = x.x/units
+
+		self.x = x
+		self.y = y
+		self.z = z
+		self._m = None
+		self._acadPoint3D = None
+
+	@property
+	def m(self):
+		'''Length to origin.'''
+		if self._m is None:
+			x, y, z = self.x, self.y, self.z
+			self._m = (x*x + y*y + z*z)**.5
+		return self._m
+
+	@property
+	def acadPoint3D(self):
+		'''The point as a Fusion Point3D in cm.'''
+		if self._acadPoint3D is None:
+			units = self.units
+			self._acadPoint3D = adsk.core.Point3D.create(
+				float(self.x*units),float(self.y*units),float(self.z*units))
+		return self._acadPoint3D
+
+	def __reduce__(self):
+		# Only pickle the coordinates, never the cached Fusion point
+		return (Pt,(self.x,self.y,self.z))
+
+	def __str__(self):
+		return str((self.x,self.y,self.z))
+
+	def rotate(self,degrees,center=(0,0,0)):
+		'''Returns a rotated point in 2D around a center.'''
+		# Rotation units are degrees!
+		d = self-center
+		rads = math.pi * degrees / 180
+		c = math.cos(rads)
+		s = math.sin(rads)
+		return center+Pt(d.x*c-d.y*s,d.y*c+d.x*s,d.z)
+
+
+	# Overloaded operators
+	def __or__(self,other):
+		'''Take the x of the self and the y of other.'''
+		if isinstance(other,PointArray): # Let the array handle it
+			return NotImplemented
+		if not isinstance(other,Pt):
+			other = Pt(*other)
+		return Pt(self.x,other.y)
+
+	def __ror__(self,other):
+		'''Take the x of other and the y of self.'''
+		if not isinstance(other,Pt):
+			other = Pt(*other)
+		return Pt(other.x,self.y)
+
+	def __mod__(self,other):
+		'''Take the midpoint of the two points.'''
+		if isinstance(other,PointArray): # Let the array handle it
+			return NotImplemented
+		if not isinstance(other,Pt):
+			other = Pt(*other)
+		return Pt((self.x+other.x)/2,(self.y+other.y)/2)
+
+	def __rmod__(self,other):
+		'''Called when python tries to evaluate other % self.'''
+		return self % other
+
+	def __xor__(self,other):
+		'''Take the x,y of self and the z of other.'''
+		if isinstance(other,PointArray): # Let the array handle it
+			return NotImplemented
+		if not isinstance(other,Pt):
+			other = Pt(*other)
+		return Pt(self.x,self.y,other.z)
+
+	def __rxor__(self,other):
+		'''Called when python tries to evaluate other ^ self.'''
+		if not isinstance(other,Pt):
+			other = Pt(*other)
+		return Pt(other.x,other.y,self.z)
+
+	def __add__(self,other):
+		'''Sum the x and y.'''
+		if isinstance(other,PointArray): # Let the array handle it
+			return NotImplemented
+		if not isinstance(other,Pt):
+			other = Pt(*other)
+		return Pt(self.x+other.x,self.y+other.y,self.z+other.z)
+
+	def __radd__(self,other):
+		'''Called when python tries to evaluate other + self.'''
+		return self + other
+
+	def __sub__(self,other):
+		'''Difference the x and y.'''
+		if isinstance(other,PointArray): # Let the array handle it
+			return NotImplemented
+		if not isinstance(other,Pt):
+			other = Pt(*other)
+		return Pt(self.x-other.x,self.y-other.y,self.z-other.z)
+	def __rsub__(self,other):
+		'''Called when python tries to evaluate other - self.'''
+		if not isinstance(other,Pt):
+			other = Pt(*other)
+		return Pt(other.x-self.x,other.y-self.y,other.z-self.z)
+
+	def __mul__(self,scalar):
+		'''Multiply with scalar.'''
+		return Pt(self.x*scalar,self.y*scalar,self.z*scalar)
+	def __rmul__(self,other):
+		'''Called when python tries to evaluate other * self.'''
+		return self * other
+
+	def __truediv__(self,scalar):
+		'''Divide by scalar.'''
+		return self * (1/scalar)
+
+class PointArray:
+	# Points are stored as x, y and z columns, which are NumPy arrays if NumPy
+	# is available (it is not bundled with Fusion) and lists otherwise.
+	__slots__ = ('x','y','z')
+
+	def __init__(self,pts=()):
+		'''Construct an array from a list of Points or tuples.'''
+		pts = [pt if isinstance(pt,Pt) else Pt(*pt) for pt in pts]
+		self.x = _col([pt.x for pt in pts])
+		self.y = _col([pt.y for pt in pts])
+		self.z = _col([pt.z for pt in pts])
+
+	@classmethod
+	def columns(cls,x,y,z):
+		'''Construct an array from x, y and z columns (or scalars).'''
+		n = max(len(c) for c in (x,y,z) if not _isscalar(c))
+		arr = cls.__new__(cls)
+		arr.x = _col(x,n)
+		arr.y = _col(y,n)
+		arr.z = _col(z,n)
+		return arr
+
+	def __len__(self):
+		return len(self.x)
+
+	def __getitem__(self,i):
+		return Pt(_item(self.x[i]),_item(self.y[i]),_item(self.z[i]))
+
+	def __iter__(self):
+		for x,y,z in zip(_list(self.x),_list(self.y),_list(self.z)):
+			yield Pt(x,y,z)
+
+	def __str__(self):
+		return str([str(pt) for pt in self])
+
+	def __reduce__(self):
+		return (PointArray.columns,
+			(_list(self.x),_list(self.y),_list(self.z)))
+
+	def turn(self,u):
+		'''Multiply x,y by the direction u, rotating about the origin.'''
+		# Also scales by the xy length of u, which is 1 for a pure rotation
+		if not isinstance(u,Pt):
+			u = Pt(*u)
+		mul = operator.mul
+		return PointArray.columns(
+			_op(_op(self.x,u.x,mul),_op(self.y,u.y,mul),operator.sub),
+			_op(_op(self.x,u.y,mul),_op(self.y,u.x,mul),operator.add),
+			self.z)
+
+	def rotate(self,degrees,center=(0,0,0)):
+		'''Returns the points rotated in 2D around a center.'''
+		# Rotation units are degrees!
+		rads = math.pi * degrees / 180
+		return (self-center).turn((math.cos(rads),math.sin(rads)))+center
+
+	def scale(self,sx=1,sy=1,sz=1):
+		'''Multiply each coordinate by its own scalar.'''
+		return PointArray.columns(_op(self.x,sx,operator.mul),
+			_op(self.y,sy,operator.mul),_op(self.z,sz,operator.mul))
+
+	# Overloaded operators
+	def __or__(self,other):
+		'''Take the x of the self and the y of other.'''
+		other = _cols(other)
+		return PointArray.columns(self.x,other[1],0)
+
+	def __ror__(self,other):
+		'''Take the x of other and the y of self.'''
+		other = _cols(other)
+		return PointArray.columns(other[0],self.y,0)
+
+	def __mod__(self,other):
+		'''Take the midpoint of the two points.'''
+		other = _cols(other)
+		return PointArray.columns(_op(_op(self.x,other[0],operator.add),.5,operator.mul),
+			_op(_op(self.y,other[1],operator.add),.5,operator.mul),0)
+
+	def __rmod__(self,other):
+		'''Called when python tries to evaluate other % self.'''
+		return self % other
+
+	def __xor__(self,other):
+		'''Take the x,y of self and the z of other.'''
+		other = _cols(other)
+		return PointArray.columns(self.x,self.y,other[2])
+
+	def __rxor__(self,other):
+		'''Called when python tries to evaluate other ^ self.'''
+		other = _cols(other)
+		return PointArray.columns(other[0],other[1],self.z)
+
+	def __add__(self,other):
+		'''Sum the x and y.'''
+		other = _cols(other)
+		return PointArray.columns(_op(self.x,other[0],operator.add),
+			_op(self.y,other[1],operator.add),_op(self.z,other[2],operator.add))
+
+	def __radd__(self,other):
+		'''Called when python tries to evaluate other + self.'''
+		return self + other
+
+	def __sub__(self,other):
+		'''Difference the x and y.'''
+		other = _cols(other)
+		return PointArray.columns(_op(self.x,other[0],operator.sub),
+			_op(self.y,other[1],operator.sub),_op(self.z,other[2],operator.sub))
+
+	def __rsub__(self,other):
+		'''Called when python tries to evaluate other - self.'''
+		return self*-1 + other
+
+	def __mul__(self,scalar):
+		'''Multiply with scalar.'''
+		return self.scale(scalar,scalar,scalar)
+
+	def __rmul__(self,other):
+		'''Called when python tries to evaluate other * self.'''
+		return self * other
+
+	def __truediv__(self,scalar):
+		'''Divide by scalar.'''
+		return self * (1/scalar)
+
+# Column helpers for PointArray
+def _isscalar(c):
+	return not isinstance(c,(list,tuple)) and not (
+		np is not None and isinstance(c,np.ndarray))
+
+def _col(c,n=None):
+	'''Return a column from a sequence, or from a scalar repeated n times.'''
+	if _isscalar(c):
+		c = [c for i in range(n)]
+	return np.asarray(c,dtype=float) if np is not None else list(c)
+
+def _list(c):
+	'''Return a column as a list of python numbers.'''
+	return c.tolist() if np is not None else c
+
+def _item(v):
+	return float(v) if np is not None else v
+
+def _cols(other):
+	'''Return the x, y and z columns (or scalars) of an array, Point or tuple.'''
+	if isinstance(other,PointArray):
+		return other.x, other.y, other.z
+	if not isinstance(other,Pt):
+		other = Pt(*other)
+	return other.x, other.y, other.z
+
+def _op(a,b,f):
+	'''Apply f elementwise to a column and a column or scalar.'''
+	if np is not None:
+		return f(a,b)
+	if _isscalar(b):
+		return [f(i,b) for i in a]
+	return [f(i,j) for i,j in zip(a,b)]
@@ -0,0 +1,68 @@
+'''
+Build profiling.
+
+A Profiler attached to a design times every element drawn (by element type),
+every primitive, flush of queued features and sketch clean up (by Fusion API
+category) and every circuit. Nothing is timed when a design has no profiler.
+'''
+
+import json
+import time
+import contextlib
+
+class Profiler:
+	def __init__(self):
+		'''Collect call counts and wall time of a build.'''
+		self.stats = {} # [calls, seconds] by (category, name)
+		self.starts = [] # Callbacks f(category,name,context) at each start
+		self.ends = [] # Callbacks f(category,name,context,seconds) at each end
+
+	def add_hook(self,start=None,end=None):
+		'''Call start and end around everything that is timed.'''
+		if start is not None:
+			self.starts.append(start)
+		if end is not None:
+			self.ends.append(end)
+
+	@contextlib.contextmanager
+	def timer(self,category,name,context=None):
+		'''Time a block as one call of name in a category.'''
+		for f in self.starts:
+			f(category,name,context)
+		start = time.perf_counter()
+		try:
+			yield
+		finally:
+			seconds = time.perf_counter()-start
+			stat = self.stats.setdefault((category,name),[0,0.0])
+			stat[0] += 1
+			stat[1] += seconds
+			for f in self.ends:
+				f(category,name,context,seconds)
+
+	def reset(self):
+		self.stats = {}
+
+	def report(self):
+		'''Return {category: {name: {'calls','seconds'}}}.'''
+		out = {}
+		for (category,name),(calls,seconds) in self.stats.items():
+			out.setdefault(category,{})[name] = {
+				'calls': calls, 'seconds': seconds}
+		return out
+
+	def table(self):
+		'''Return the report as a text table, slowest first in each category.'''
+		lines = ['{:<10}{:<24}{:>8}{:>10}'.format(
+			'category','name','calls','seconds')]
+		for category,names in sorted(self.report().items()):
+			for name,stat in sorted(names.items(),
+				key=lambda item: -item[1]['seconds']):
+				lines.append('{:<10}{:<24}{:>8}{:>10.3f}'.format(
+					category,name,stat['calls'],stat['seconds']))
+		return '\n'.join(lines)
+
+	def dump(self,path):
+		'''Write the report to a JSON file.'''
+		with open(path,'w') as f:
+			json.dump(self.report(),f,indent=1)
@@ -1,181 +1,228 @@
-'''
-Section classes.
-'''
-
-import adsk.core, adsk.fusion, traceback
-
-import math
-
-from .point import *
-
-
-class Section:
-	# TBD: Implement a method called "invert" to return a new section with 
-	# inverted height in Z. Currently, we just copy the section and rewrite the 
-	# value for Section.H to -Section.H
-	pass
-
-class RecSec(Section):
-	def __init__(self,W=250, H=50):
-		'''Constructor for Rectangular Section.'''
-		self.W = W
-		self.H = H
-		self.span = W # Used to avoid loft self-intersections
-		h = abs(H*1e-6) # SI height
-		w = abs(W*1e-6) # SI width
-		# Multiply following by mu*L to obtain resistance in SI
-		# This has units of 1/(m^4)
-		self.res_muL = 12/((1-0.63*(h/w))*h**3*w)
-
-	def draw(self,circuit,pc,n):
-		'''Return the path centered around pc normal to n.'''
-		# Here we draw the section normal to x axis, then rotate it.
-		W = self.W
-		H = self.H
-		px = [0,0,0,0]
-		py = [-W/2,W/2,W/2,-W/2]
-		pz = [0,0,H,H]
-		# Rotate the x and y
-		u = n/n.m
-		rotm = [[u.x,-u.y],[u.y,u.x]]
-		rotx = [rotm[0][0]*px[i]+rotm[0][1]*py[i] for i in range(len(px))]
-		roty = [rotm[1][0]*px[i]+rotm[1][1]*py[i] for i in range(len(py))]
-		pts = [Pt(rotx[i],roty[i],pz[i]) for i in range(len(px))]
-		pts = [pt+pc for pt in pts] # Offset by center point
-		# Draw in fusion
-		collection = adsk.core.ObjectCollection.create()
-		for i in range(len(pts)):
-			collection.add(circuit._sketch.sketchCurves.sketchLines
-				.addByTwoPoints(pts[i-1].acadPoint3D,pts[i].acadPoint3D))
-		path = circuit._comp.features.createPath(collection)
-		return path
-
-class CurveSec(Section):
-	def __init__(self,W=250,H=50,R=None):
-		'''Constructor for a Curvilinear section.'''
-		self.W = W
-		self.H = H
-		self.R = H if R is None else R
-		self.span = W # Used to avoid loft self-intersections
-		h = abs(H*1e-6) # SI height
-		w = abs(W*1e-6) # SI width
-		r = abs(self.R*1e-6) # SI radius
-		# Multiply following by mu*L to obtain resistance in SI
-		# This has units of 1/(m^4)
-		# Originally, used the 2*P^2/A^3 approximation, but that is practically 
-		# equivalent to the parallel infinite plate approximation.
-		# The infinite parallel plate approximation underestimates the true resistance.
-		# P = 2*w + 2*h - 4*r + math.pi*r
-		# A = w*h - 2*r*r + 0.5*math.pi*r*r
-		# self.res_muL = 2*(P*P)/(A*A*A)
-		# A better approximation is the rectangle approximation, which is used above.
-		# Note: the rectangle approximation ALSO underestimates true resistance 
-		# (due to chamfers), but not by much.
-		self.res_muL = 12/((1-0.63*(h/w))*h**3*w)
-
-	def draw(self,circuit,pc,n):
-		'''Return the path centered around pc normal to n.'''
-		# Here we draw the section normal to x axis, then rotate it.
-		W = self.W
-		H = self.H
-		R = self.R
-		px = [0,0,0,0]
-		py = [-W/2,W/2,W/2,-W/2]
-		pz = [0,0,H,H]
-		# Rotate the x and y
-		u = n/n.m
-		rotm = [[u.x,-u.y],[u.y,u.x]]
-		rotx = [rotm[0][0]*px[i]+rotm[0][1]*py[i] for i in range(len(px))]
-		roty = [rotm[1][0]*px[i]+rotm[1][1]*py[i] for i in range(len(py))]
-		pts = [Pt(rotx[i],roty[i],pz[i]) for i in range(len(px))]
-		pts = [pt+pc for pt in pts] # Offset by center point
-		# Draw in fusion
-		segs = []
-		for i in range(len(pts)):
-			seg = circuit._sketch.sketchCurves.sketchLines.addByTwoPoints(
-				pts[i-1].acadPoint3D,pts[i].acadPoint3D)
-			segs.append(seg)
-		# Add fillets
-		arc1 = circuit._sketch.sketchCurves.sketchArcs.addFillet(
-			segs[2],segs[2].endSketchPoint.geometry,
-			segs[3],segs[3].startSketchPoint.geometry,
-			abs(R)*circuit.design.units)
-		arc2 = circuit._sketch.sketchCurves.sketchArcs.addFillet(
-			segs[-1],segs[-1].endSketchPoint.geometry,
-			segs[0],segs[0].startSketchPoint.geometry,
-			abs(R)*circuit.design.units)
-		collection = adsk.core.ObjectCollection.create()
-		objs = segs[:3]+[arc1]+[segs[3]]+[arc2] # Add in order
-		for obj in objs:
-			if obj.isValid:
-				collection.add(obj)
-		path = circuit._comp.features.createPath(collection)
-		return path
-
-class TrapzSec(Section):
-	def __init__(self,W=250, H=50, Wt=None, Ht=None):
-		'''Constructor for Trapezoidal Section.'''
-		self.W = W
-		self.H = H
-		# Height and Width of tapered section is Ht and Wt
-		self.Wt = W-2*abs(H) if Wt is None else Wt
-		self.Ht = math.copysign((W-self.Wt)/2,H) if Ht is None else Ht 
-		self.span = W # Used to avoid loft self-intersections
-
-	def draw(self,circuit,pc,n):
-		'''Return the path centered around pc normal to n.'''
-		# Here we draw the section normal to x axis, then rotate it.
-		W = self.W
-		H = self.H
-		Wt = self.Wt
-		Ht = self.Ht
-		dW = (W-Wt)/2 # half Width difference
-		px = [0,0,0,0,0,0]
-		py = [-W/2+dW,W/2-dW,W/2,W/2,-W/2,-W/2]
-		pz = [H,H,H-Ht,0,0,H-Ht]
-		# Rotate the x and y
-		u = n/n.m
-		rotm = [[u.x,-u.y],[u.y,u.x]]
-		rotx = [rotm[0][0]*px[i]+rotm[0][1]*py[i] for i in range(len(px))]
-		roty = [rotm[1][0]*px[i]+rotm[1][1]*py[i] for i in range(len(py))]
-		pts = [Pt(rotx[i],roty[i],pz[i]) for i in range(len(px))]
-		pts = [pt+pc for pt in pts] # Offset by center point
-		# Draw in fusion
-		collection = adsk.core.ObjectCollection.create()
-		for i in range(len(pts)):
-			if (pts[i-1]-pts[i]).m > 1e-3:
-				collection.add(circuit._sketch.sketchCurves.sketchLines
-					.addByTwoPoints(pts[i-1].acadPoint3D,pts[i].acadPoint3D))
-		path = circuit._comp.features.createPath(collection)
-		return path
-
-class TubeSec(Section):
-	def __init__(self,R=250):
-		'''Constructor for a Tube section.'''
-		self.R = R
-		self.span = 2*R # Used to avoid loft self-intersections
-
-	def draw(self,circuit,pc,n):
-		'''Return the path centered around pc normal to n.'''
-		# Here we draw the section normal to x axis, then rotate it.
-		m = 32 # Number of facets to make up the tube
-		R = self.R
-
-		px = [0 for i in range(m)];
-		py = [R*math.cos(2*math.pi*i/m) for i in range(m)]
-		pz = [R*math.sin(2*math.pi*i/m) for i in range(m)]
-
-		# Rotate the x and y
-		u = n/n.m
-		rotm = [[u.x,-u.y],[u.y,u.x]]
-		rotx = [rotm[0][0]*px[i]+rotm[0][1]*py[i] for i in range(len(px))]
-		roty = [rotm[1][0]*px[i]+rotm[1][1]*py[i] for i in range(len(py))]
-		pts = [Pt(rotx[i],roty[i],pz[i]) for i in range(len(px))]
-		pts = [pt+pc for pt in pts] # Offset by center point
-		# Draw in fusion
-		collection = adsk.core.ObjectCollection.create()
-		for i in range(len(pts)):
-			collection.add(circuit._sketch.sketchCurves.sketchLines
-				.addByTwoPoints(pts[i-1].acadPoint3D,pts[i].acadPoint3D))
-		path = circuit._comp.features.createPath(collection)
-		return path
\ No newline at end of file
+'''
+Section classes.
+'''
+
+import math
+
+from .point import *
+from .geometry import *
+
+
+class Section:
+	'''Base class for immutable cross-sections with a cached local profile.'''
+	_fields = () # Names of the parameters defining the section
+	_profiles = {} # Cache of local profiles shared by all equal sections
+
+	def __setattr__(self,name,value):
+		if getattr(self,'_frozen',False):
+			raise AttributeError('Sections are immutable, make a new one instead.')
+		object.__setattr__(self,name,value)
+
+	def key(self):
+		'''Return a hashable key of the section type and parameters.'''
+		return (type(self).__name__,)+tuple(
+			getattr(self,f) for f in self._fields)
+
+	def __eq__(self,other):
+		return isinstance(other,Section) and self.key() == other.key()
+
+	def __hash__(self):
+		return hash(self.key())
+
+	def __repr__(self):
+		return '{}({})'.format(type(self).__name__,', '.join(
+			'{}={}'.format(f,getattr(self,f)) for f in self._fields))
+
+	def invert(self):
+		'''Return a new section with inverted height in Z.'''
+		params = {f: getattr(self,f) for f in self._fields}
+		params['H'] = -self.H
+		return type(self)(**params)
+
+	def tessellation(self):
+		'''Return the number of facets used for curved profiles, if any.'''
+		return None
+
+	def draft(self):
+		'''Return a cheaper section of the same size for draft mode.'''
+		return self
+
+	def resolve(self,tol):
+		'''Return the section with details finer than tol removed.'''
+		return self
+
+	def local(self):
+		'''Return the cached local profile as a PointArray and curve template.'''
+		key = (self.key(),self.tessellation())
+		local = Section._profiles.get(key)
+		if local is None:
+			local = _flatten(self.local_curves())
+			Section._profiles[key] = local
+		return local
+
+	def profile(self,pc,n):
+		'''Return the curves of the section centered around pc normal to n.'''
+		pts, template = self.local()
+		# Rotate the x and y, then offset by the center point
+		u = n/n.m
+		return _unflatten(template,list(pts.turn(u)+pc))
+
+	def draw(self,circuit,pc,n):
+		'''Draw the profile centered around pc normal to n and return its path.'''
+		return circuit.design.backend.path(circuit,self.profile(pc,n))
+
+def _flatten(curves):
+	'''Split curves into an array of their points and a template of indices.'''
+	pts = []
+	template = []
+	for curve in curves:
+		if isinstance(curve,Arc):
+			template.append((len(pts),len(pts)+1,len(pts)+2,len(pts)+3,curve.R))
+			pts += [curve.p1,curve.pm,curve.p2,curve.center]
+		else:
+			template.append((len(pts),len(pts)+1))
+			pts += [curve.p1,curve.p2]
+	return PointArray(pts), template
+
+def _unflatten(template,pts):
+	'''Rebuild curves from a template and a list of placed points.'''
+	curves = []
+	for t in template:
+		if len(t) == 2:
+			curves.append(Line(pts[t[0]],pts[t[1]]))
+		else:
+			curves.append(Arc(pts[t[0]],pts[t[1]],pts[t[2]],pts[t[3]],t[4]))
+	return curves
+
+class RecSec(Section):
+	_fields = ('W','H')
+	def __init__(self,W=250, H=50):
+		'''Constructor for Rectangular Section.'''
+		self.W = W
+		self.H = H
+		self.span = W # Used to avoid loft self-intersections
+		h = abs(H*1e-6) # SI height
+		w = abs(W*1e-6) # SI width
+		# Multiply following by mu*L to obtain resistance in SI
+		# This has units of 1/(m^4)
+		self.res_muL = 12/((1-0.63*(h/w))*h**3*w)
+		self._frozen = True
+
+	def local_curves(self):
+		'''Return the curves of the section normal to the x axis.'''
+		W = self.W
+		H = self.H
+		py = [-W/2,W/2,W/2,-W/2]
+		pz = [0,0,H,H]
+		pts = [Pt(0,py[i],pz[i]) for i in range(len(py))]
+		return [Line(pts[i-1],pts[i]) for i in range(len(pts))]
+
+class CurveSec(Section):
+	_fields = ('W','H','R')
+	def __init__(self,W=250,H=50,R=None):
+		'''Constructor for a Curvilinear section.'''
+		self.W = W
+		self.H = H
+		self.R = H if R is None else R
+		self.span = W # Used to avoid loft self-intersections
+		h = abs(H*1e-6) # SI height
+		w = abs(W*1e-6) # SI width
+		r = abs(self.R*1e-6) # SI radius
+		# Multiply following by mu*L to obtain resistance in SI
+		# This has units of 1/(m^4)
+		# Originally, used the 2*P^2/A^3 approximation, but that is practically 
+		# equivalent to the parallel infinite plate approximation.
+		# The infinite parallel plate approximation underestimates the true resistance.
+		# P = 2*w + 2*h - 4*r + math.pi*r
+		# A = w*h - 2*r*r + 0.5*math.pi*r*r
+		# self.res_muL = 2*(P*P)/(A*A*A)
+		# A better approximation is the rectangle approximation, which is used above.
+		# Note: the rectangle approximation ALSO underestimates true resistance 
+		# (due to chamfers), but not by much.
+		self.res_muL = 12/((1-0.63*(h/w))*h**3*w)
+		self._frozen = True
+
+	def local_curves(self):
+		'''Return the curves of the section normal to the x axis.'''
+		W = self.W
+		H = self.H
+		R = self.R
+		py = [-W/2,W/2,W/2,-W/2]
+		pz = [0,0,H,H]
+		pts = [Pt(0,py[i],pz[i]) for i in range(len(py))]
+		# Fillet the two corners away from the draw plane
+		return fillet_loop(pts,[0,0,abs(R),abs(R)])
+
+	def draft(self):
+		'''Drop the fillets.'''
+		return RecSec(W=self.W,H=self.H)
+
+class TrapzSec(Section):
+	_fields = ('W','H','Wt','Ht')
+	def __init__(self,W=250, H=50, Wt=None, Ht=None):
+		'''Constructor for Trapezoidal Section.'''
+		self.W = W
+		self.H = H
+		# Height and Width of tapered section is Ht and Wt
+		self.Wt = W-2*abs(H) if Wt is None else Wt
+		self.Ht = math.copysign((W-self.Wt)/2,H) if Ht is None else Ht 
+		self.span = W # Used to avoid loft self-intersections
+		self._frozen = True
+
+	def invert(self):
+		'''Return a new section with inverted height (and taper) in Z.'''
+		return TrapzSec(W=self.W,H=-self.H,Wt=self.Wt,Ht=-self.Ht)
+
+	def resolve(self,tol):
+		'''Drop a taper too small to print.'''
+		if (self.W-self.Wt)/2 < tol and abs(self.Ht) < tol:
+			return RecSec(W=self.W,H=self.H)
+		return self
+
+	def local_curves(self):
+		'''Return the curves of the section normal to the x axis.'''
+		W = self.W
+		H = self.H
+		Wt = self.Wt
+		Ht = self.Ht
+		dW = (W-Wt)/2 # half Width difference
+		py = [-W/2+dW,W/2-dW,W/2,W/2,-W/2,-W/2]
+		pz = [H,H,H-Ht,0,0,H-Ht]
+		pts = [Pt(0,py[i],pz[i]) for i in range(len(py))]
+		return [Line(pts[i-1],pts[i]) for i in range(len(pts))
+			if (pts[i-1]-pts[i]).m > 1e-3]
+
+class TubeSec(Section):
+	_fields = ('R','m')
+	def __init__(self,R=250,m=None):
+		'''Constructor for a Tube section of m facets (chosen by traces if None).'''
+		self.R = R
+		self.m = m
+		self.span = 2*R # Used to avoid loft self-intersections
+		self._frozen = True
+
+	def invert(self):
+		'''A tube is symmetric in Z, so it is its own inverse.'''
+		return self
+
+	def tessellation(self):
+		return self.m or 32 # Number of facets to make up the tube
+
+	def draft(self):
+		return TubeSec(R=self.R,m=min(self.tessellation(),8))
+
+	def resolve(self,tol):
+		'''Use just enough facets to stay within tol of the circle.'''
+		if self.m is not None:
+			return self
+		return TubeSec(R=self.R,m=max(6,segments(self.R,2*math.pi,tol)))
+
+	def local_curves(self):
+		'''Return the curves of the section normal to the x axis.'''
+		m = self.tessellation()
+		R = self.R
+
+		py = [R*math.cos(2*math.pi*i/m) for i in range(m)]
+		pz = [R*math.sin(2*math.pi*i/m) for i in range(m)]
+		pts = [Pt(0,py[i],pz[i]) for i in range(m)]
+		return [Line(pts[i-1],pts[i]) for i in range(len(pts))]
\ No newline at end of file
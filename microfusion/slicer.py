@@ -0,0 +1,232 @@
+'''
+DLP slicing.
+
+Rasterizes the geometry of a design into one bitmap per printed layer, at the
+pixel pitch and layer height of the printer, without going through a mesh
+file and a third-party slicer. Pixels are aligned to multiples of the pitch
+from the design origin, so features sized in whole pixels stay exact.
+
+Each layer is sampled at its mid height. Pixels inside a substrate are lit,
+and pixels inside a channel, via or port are dark. Designs without substrates
+light the channels instead. Layers are generated lazily, and only the
+primitives crossing the current layer are held in memory.
+'''
+
+import os
+import math
+import zlib
+import struct
+import concurrent.futures
+
+try:
+	import numpy as np
+except ImportError: # Fall back to plain Python scanlines without NumPy
+	np = None
+
+from .mesh import *
+
+class Grid:
+	def __init__(self,pitch,bounds):
+		'''Pixels of size pitch covering bounds (x0, y0, x1, y1).'''
+		self.pitch = pitch
+		self.x0 = math.floor(bounds[0]/pitch)*pitch
+		self.y0 = math.floor(bounds[1]/pitch)*pitch
+		self.nx = max(1,math.ceil((bounds[2]-self.x0)/pitch))
+		self.ny = max(1,math.ceil((bounds[3]-self.y0)/pitch))
+
+	def blank(self):
+		'''Return an unlit image, indexed [row][column] from the lowest y.'''
+		if np is not None:
+			return np.zeros((self.ny,self.nx),np.uint8)
+		return [bytearray(self.nx) for j in range(self.ny)]
+
+def cut(tris,z):
+	'''Return the segments ((x1, y1), (x2, y2)) where triangles cross z.'''
+	segs = []
+	for tri in tris:
+		above = [p[2] > z for p in tri]
+		if all(above) or not any(above):
+			continue
+		seg = []
+		for i in range(3):
+			a, b = tri[i-1], tri[i]
+			if above[i-1] != above[i]:
+				t = (z-a[2])/(b[2]-a[2])
+				seg.append((a[0]+(b[0]-a[0])*t,a[1]+(b[1]-a[1])*t))
+		segs.append(seg)
+	return segs
+
+def fill(image,grid,segs,value):
+	'''Set the pixels inside closed loops of segments (even-odd) to value.'''
+	p = grid.pitch
+	crossings = {} # Columns where each row crosses the outline
+	for (x1,y1),(x2,y2) in segs:
+		if y1 == y2:
+			continue
+		j0 = max(0,math.ceil((min(y1,y2)-grid.y0)/p-.5))
+		j1 = min(grid.ny,math.ceil((max(y1,y2)-grid.y0)/p-.5))
+		for j in range(j0,j1):
+			y = grid.y0+(j+.5)*p
+			x = x1+(y-y1)*(x2-x1)/(y2-y1)
+			crossings.setdefault(j,[]).append(
+				min(grid.nx,max(0,math.ceil((x-grid.x0)/p-.5))))
+	for j,cols in crossings.items():
+		cols.sort()
+		row = image[j]
+		for i0,i1 in zip(cols[::2],cols[1::2]):
+			row[i0:i1] = bytes([value])*(i1-i0)
+
+def cut_array(tris,z):
+	'''cut() for an (n, 3, 3) array of triangles, returning an (m, 2, 2) array.'''
+	above = tris[:,:,2] > z
+	n = above.sum(1)
+	tris = tris[(n == 1) | (n == 2)]
+	above = above[(n == 1) | (n == 2)]
+	a = tris[:,[2,0,1]] # Start of the edge ending at each vertex
+	b = tris
+	crossed = above[:,[2,0,1]] != above
+	with np.errstate(divide='ignore',invalid='ignore'): # Uncrossed edges
+		t = (z-a[:,:,2])/(b[:,:,2]-a[:,:,2])
+		pts = a[:,:,:2]+(b[:,:,:2]-a[:,:,:2])*t[:,:,None]
+	return pts[crossed].reshape(-1,2,2) # Two crossed edges per triangle
+
+def fill_array(image,grid,segs,value):
+	'''fill() for an image array and an array of segments.'''
+	p = grid.pitch
+	y1, y2 = segs[:,0,1], segs[:,1,1]
+	j0 = np.ceil((np.minimum(y1,y2)-grid.y0)/p-.5).astype(int)
+	j1 = np.ceil((np.maximum(y1,y2)-grid.y0)/p-.5).astype(int)
+	counts = np.maximum(j1-j0,0)
+	if not counts.sum():
+		return
+	# One crossing for every row spanned by every segment
+	seg = np.repeat(np.arange(len(segs)),counts)
+	rows = j0[seg]+np.arange(counts.sum())-np.repeat(np.cumsum(counts)-counts,counts)
+	y = grid.y0+(rows+.5)*p
+	(x1,y1),(x2,y2) = segs[seg,0].T, segs[seg,1].T
+	x = x1+(y-y1)*(x2-x1)/(y2-y1)
+	cols = np.clip(np.ceil((x-grid.x0)/p-.5).astype(int),0,grid.nx)
+	keep = (rows >= 0) & (rows < grid.ny)
+	rows, cols = rows[keep], cols[keep]
+	if not len(rows):
+		return
+	# Pair up the sorted crossings of each row into spans to fill
+	order = np.lexsort((cols,rows))
+	rows, cols = rows[order], cols[order]
+	for j,i0,i1 in zip(rows[::2].tolist(),cols[::2].tolist(),
+		cols[1::2].tolist()):
+		image[j,i0:i1] = value
+
+def _shell(prim,tol):
+	'''Return the triangles of a primitive and their bounds.'''
+	tris = list(triangles(prim,tol))
+	if not tris:
+		return None, None
+	xs = [p[0] for t in tris for p in t]
+	ys = [p[1] for t in tris for p in t]
+	zs = [p[2] for t in tris for p in t]
+	bounds = (min(xs),min(ys),min(zs),max(xs),max(ys),max(zs))
+	return (np.array(tris,float) if np is not None else tris), bounds
+
+def layers(solids,voids=(),pitch=27,height=50,bounds=None,tol=None):
+	'''Yield (z, image) for each layer from the bottom, voids cut from solids.'''
+	tol = pitch/4 if tol is None else tol
+	# First pass only finds the bounds, so that triangles are not kept
+	shells = []
+	for value,groups in ((1,solids),(0,voids)):
+		for prims in groups:
+			for prim in prims:
+				tris, box = _shell(prim,tol)
+				if box is not None:
+					shells.append((box[2],box[5],value,box,prim))
+	if not shells:
+		return
+	lit = [s for s in shells if s[2]] or shells
+	if bounds is None:
+		bounds = (min(s[3][0] for s in lit),min(s[3][1] for s in lit),
+			max(s[3][3] for s in lit),max(s[3][4] for s in lit))
+	grid = Grid(pitch,bounds)
+	shells.sort(key=lambda s: s[0])
+	z0 = math.floor(shells[0][0]/height)*height
+	z1 = max(s[1] for s in shells)
+	active = [] # (zmax, value, triangles) of shells crossing the layer
+	k = 0 # Next shell to activate
+	for i in range(math.ceil((z1-z0)/height)):
+		z = z0+(i+.5)*height
+		while k < len(shells) and shells[k][0] < z:
+			tris, box = _shell(shells[k][4],tol)
+			active.append((shells[k][1],shells[k][2],tris))
+			k += 1
+		active = [a for a in active if a[0] > z]
+		image = grid.blank()
+		for value in (1,0): # Light the solids, then clear the voids
+			for zmax,v,tris in active:
+				if v != value:
+					continue
+				if np is not None:
+					fill_array(image,grid,cut_array(tris,z),value)
+				else:
+					fill(image,grid,cut(tris,z),value)
+		yield z-height/2, image
+
+def design_layers(design,pitch=27,height=50,**kwargs):
+	'''Yield the layers of a design, cutting its channels out of its substrates.'''
+	if design.substrates:
+		return layers(element_groups(design,channels=False),
+			element_groups(design,substrates=False),pitch,height,**kwargs)
+	return layers(element_groups(design),(),pitch,height,**kwargs)
+
+def backend_layers(backend,pitch=27,height=50,**kwargs):
+	'''Yield the layers of the primitives recorded by a geometry backend.'''
+	if any(any(cir is c for c,zspan in cir.design.substrates)
+		for cir,prim in backend.prims):
+		return layers(backend_groups(backend,channels=False),
+			backend_groups(backend,substrates=False),pitch,height,**kwargs)
+	return layers(backend_groups(backend),(),pitch,height,**kwargs)
+
+
+## PNG output
+def write_png(path,image):
+	'''Write an image of 0 and 1 as an 8 bit grayscale PNG, highest y on top.'''
+	if np is not None:
+		image = np.asarray(image,np.uint8)
+		ny, nx = image.shape
+		rows = np.zeros((ny,nx+1),np.uint8) # Filter byte 0 starts each row
+		rows[:,1:] = image[::-1]*255
+		raw = rows.tobytes()
+	else:
+		ny, nx = len(image), len(image[0])
+		table = bytes([0])+bytes([255])*255
+		raw = b''.join(b'\0'+bytes(row).translate(table) for row in image[::-1])
+	def chunk(kind,data):
+		return (struct.pack('>I',len(data))+kind+data
+			+struct.pack('>I',zlib.crc32(kind+data)))
+	with open(path,'wb') as f:
+		f.write(b'\x89PNG\r\n\x1a\n')
+		f.write(chunk(b'IHDR',struct.pack('>IIBBBBB',nx,ny,8,0,0,0,0)))
+		f.write(chunk(b'IDAT',zlib.compress(raw,6)))
+		f.write(chunk(b'IEND',b''))
+
+def write_pngs(layers,directory,parallel=None,name='layer_{:05d}.png'):
+	'''Write each (z, image) layer to a numbered PNG in a directory.'''
+	os.makedirs(directory,exist_ok=True)
+	parallel = parallel or os.cpu_count() or 1
+	zs = []
+	pending = []
+	with concurrent.futures.ThreadPoolExecutor(parallel) as pool:
+		for i,(z,image) in enumerate(layers):
+			pending.append(pool.submit(write_png,
+				os.path.join(directory,name.format(i)),image))
+			zs.append(z)
+			if len(pending) >= 2*parallel:
+				pending.pop(0).result()
+		for future in pending:
+			future.result()
+	return zs
+
+def export_png(backend,path,height=50):
+	'''Write the layers of a geometry backend as PNGs in path/layers.'''
+	pitch = 27
+	if backend.prims:
+		pitch = backend.prims[0][0].design.params.get('fab_res') or pitch
+	write_pngs(backend_layers(backend,pitch,height),os.path.join(path,'layers'))
@@ -0,0 +1,136 @@
+'''
+Parametric sweeps.
+
+Builds every combination of a parameter grid of a device script headless, each
+variant in its own worker process, and writes the result of each variant to a
+directory named by a hash of its parameters. Variants already in the output
+directory are skipped. From the command line:
+
+	python -m microfusion.sweep Resin_7_0 H=50,100 via_R=300,350 --out sweeps
+
+Parameters accepted by the main() of the device script are passed to it, and
+all others are used as design params (such as slop or res_L). The outputs
+are the pickled primitives by default, or with --export stl or png meshes or
+the mask images of every printed layer.
+'''
+
+import os
+import sys
+import ast
+import json
+import pickle
+import hashlib
+import inspect
+import argparse
+import importlib
+import importlib.util
+import itertools
+import concurrent.futures
+
+from .base import *
+from .backend import *
+from . import mesh
+from . import slicer
+
+def variants(grid):
+	'''Return a dict of parameters for every combination in a grid of lists.'''
+	keys = sorted(grid)
+	return [dict(zip(keys,values))
+		for values in itertools.product(*(grid[key] for key in keys))]
+
+def source_hash(device):
+	'''Return a hash of the source file of a device module, if it has one.'''
+	spec = importlib.util.find_spec(device)
+	if spec is None or not spec.origin or not os.path.isfile(spec.origin):
+		return None
+	with open(spec.origin,'rb') as f:
+		return hashlib.sha1(f.read()).hexdigest()
+
+def variant_hash(device,variant,source=None,export=None):
+	'''Return a short hash of a device, its parameters, source and export.'''
+	key = repr((device,sorted(variant.items()),source,export))
+	return hashlib.sha1(key.encode()).hexdigest()[:12]
+
+def build(device,variant):
+	'''Run the main() of a device module and return its geometry backend.'''
+	main = importlib.import_module(device).main
+	accepted = inspect.signature(main).parameters
+	kwargs = {key: variant[key] for key in variant if key in accepted}
+	params = {key: variant[key] for key in variant if key not in accepted}
+	backend = GeometryBackend()
+	overrides = Design.overrides
+	Design.overrides = {'backend': backend, 'params': params}
+	try:
+		main(**kwargs)
+	finally:
+		Design.overrides = overrides
+	return backend
+
+def write_prims(backend,path):
+	'''Export the primitives as a pickled list of (circuit name, primitive).'''
+	with open(os.path.join(path,'prims.pickle'),'wb') as f:
+		pickle.dump([(cir.name,prim) for cir,prim in backend.prims],f)
+
+def _run(device,variant,path,export):
+	'''Build one variant in a worker and export it to path.'''
+	os.makedirs(path,exist_ok=True)
+	export(build(device,variant),path)
+	# The parameters are written last and mark the variant as done
+	with open(os.path.join(path,'params.tmp'),'w') as f:
+		json.dump({'device': device, 'params': variant},f,indent=1)
+	os.replace(os.path.join(path,'params.tmp'),os.path.join(path,'params.json'))
+	return path
+
+def _init(path):
+	sys.path[:] = path # Find the device module like the parent process
+
+def sweep(device,grid,out='sweeps',export=write_prims,parallel=None,
+	force=False):
+	'''Build every variant of a device in a process pool.'''
+	results = []
+	todo = []
+	source = source_hash(device)
+	name = getattr(export,'__qualname__',None) # Of functions, not partials
+	for variant in variants(grid):
+		path = os.path.join(out,variant_hash(device,variant,source,name))
+		done = os.path.exists(os.path.join(path,'params.json'))
+		if force or not done:
+			todo.append((variant,path))
+		results.append((variant,path,force or not done))
+	if todo:
+		with concurrent.futures.ProcessPoolExecutor(parallel,
+			initializer=_init,initargs=(list(sys.path),)) as pool:
+			futures = [pool.submit(_run,device,variant,path,export)
+				for variant,path in todo]
+			for future in futures:
+				future.result() # Raise the errors of workers
+	return results
+
+exports = {'prims': write_prims, 'stl': mesh.export_stl,
+	'png': slicer.export_png} # Outputs selected by --export
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(
+		description='Build every variant of a device headless.')
+	parser.add_argument('device',help='Name of the device module')
+	parser.add_argument('grid',nargs='*',metavar='NAME=V1,V2',
+		help='Parameter values to sweep')
+	parser.add_argument('--out',default='sweeps',help='Output directory')
+	parser.add_argument('-j','--parallel',type=int,
+		help='Number of worker processes (default all cores)')
+	parser.add_argument('--force',action='store_true',
+		help='Rebuild variants which are already in the output directory')
+	parser.add_argument('--export',choices=sorted(exports),default='prims',
+		help='Write the pickled primitives, STL meshes or PNG layer masks')
+	args = parser.parse_args(argv)
+	sys.path.insert(0,os.getcwd())
+	grid = {}
+	for item in args.grid:
+		name,values = item.split('=',1)
+		grid[name] = [ast.literal_eval(v) for v in values.split(',')]
+	for variant,path,built in sweep(args.device,grid,args.out,
+		exports[args.export],parallel=args.parallel,force=args.force):
+		print('built ' if built else 'cached',path,variant)
+
+if __name__ == '__main__':
+	main()
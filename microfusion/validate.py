@@ -0,0 +1,50 @@
+'''
+Pre-flight validation.
+
+Checks the elements of a design in pure Python before anything is drawn, so
+that fillets which do not fit, degenerate segments, impossible resistors and
+empty z spans are reported together and with where each element came from,
+instead of failing one at a time deep inside Fusion.
+'''
+
+class Issue:
+	def __init__(self,circuit,element,index,level,message):
+		'''A problem with element index of a circuit, of level 'error' or 'warning'.'''
+		self.circuit = circuit
+		self.element = element
+		self.index = index
+		self.level = level
+		self.message = message
+
+	def __str__(self):
+		element = self.element
+		pt = getattr(element,'pt',None) or getattr(element,'pts',[None])[0]
+		where = '' if pt is None else ' at ({:.6g}, {:.6g})'.format(pt.x,pt.y)
+		source = getattr(element,'source',None)
+		source = '' if source is None else ', {}:{}'.format(*source)
+		return '{}: {} element {} ({}{}){}: {}'.format(self.level,
+			self.circuit.name,self.index,type(element).__name__,where,source,
+			self.message)
+
+class ValidationError(Exception):
+	def __init__(self,issues):
+		'''Raised with every issue found, one per line.'''
+		self.issues = issues
+		super().__init__('{} problem(s) found before drawing:\n{}'.format(
+			len(issues),'\n'.join(str(issue) for issue in issues)))
+
+def validate(circuit,elements=None,first=None):
+	'''Return the Issues of elements of a circuit, to be added at first.'''
+	if elements is None:
+		elements, first = circuit.elements, 0
+	found = [(k,element,level,message) for k,element in enumerate(elements)
+		for level,message in element.check()]
+	if found and first is None: # Positions of the elements in the circuit
+		index = {id(element): i for i,element in enumerate(circuit.elements)}
+	return [Issue(circuit,element,first+k if first is not None
+		else index[id(element)],level,message)
+		for k,element,level,message in found]
+
+def errors(issues):
+	'''Return only the errors of a list of Issues.'''
+	return [issue for issue in issues if issue.level == 'error']